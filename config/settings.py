@@ -261,6 +261,24 @@ MEDIA_URL = '/media/'
 DEFAULT_DATA_ROOT = os.path.join(BASE_DIR, 'default_data')
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+## shared by all worker processes, the default LocMemCache is per process
+## and cached questionaire data would go stale in the other workers.
+## set CACHE_BACKEND / CACHE_LOCATION (e.g. redis) when running on several hosts.
+CACHES = {
+    'default': {
+        'BACKEND'   : os.getenv('CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION'  : os.getenv('CACHE_LOCATION', os.path.join(BASE_DIR, 'django_cache')),
+        'TIMEOUT'   : 3600,
+        'OPTIONS'   : {
+            'MAX_ENTRIES' : 10000,
+        },
+    },
+}
+
+
 ## set project level date string format
 DATE_STRING_FORMAT = '%Y-%m-%d'
 
@@ -27,6 +27,11 @@ urlpatterns = [
         views.func_import_default_investment_datas,
         name='djep_import_default_investment_datas'
     ),
+    path(
+        'urlep_import_new_investment_datas/',
+        views.func_import_new_investment_datas,
+        name='djep_import_new_investment_datas'
+    ),
     path(
         'urlep_delete_default_investment_datas/',
         views.func_delete_default_investment_datas,
@@ -1,6 +1,7 @@
 
 ### read csv files as python dictionary
 from csv import DictReader
+from csv import reader as csv_reader_lists
 
 ### import to use django auth framework
 from django.contrib.auth.models import User
@@ -11,14 +12,21 @@ from config.settings import DEFAULT_DATA_ROOT
 
 from questionaires.models import Questionaire
 from questionaire_answers.models import QuestionaireAnswer
+from questionaires.utils import bump_questionaire_definitions_version
+from questionaires.utils import questionaire_definitions_batch
+from questionaires.utils import update_all_questionaires_min_max_score
 
 from investment_types.models import InvestmentType
 from investment_choices.models import InvestmentChoice
 from investment_datas.models import InvestmentData
+from investment_datas.price_store import mark_price_store_stale
 
 from datetime import datetime
 from django.utils import timezone
 
+from django.db import transaction
+from django.db.models import Max
+
 
 def delete_questionaire_answers ():
     '''
@@ -27,6 +35,7 @@ def delete_questionaire_answers ():
     '''
     try:
         del_cnt, _ = QuestionaireAnswer.objects.all().delete()
+        bump_questionaire_definitions_version()
         return del_cnt
     except Exception as e:
         print(e)
@@ -40,6 +49,7 @@ def delete_questionaires ():
     '''
     try:
         del_cnt, _ = Questionaire.objects.all().delete()
+        bump_questionaire_definitions_version()
         return del_cnt
     except Exception as e:
         print(e)
@@ -97,8 +107,13 @@ def import_questionaire_answers ():
                     )
     # end def import_one_questionaire_answers()
 
-    import_one_questionaire_answers('IAAF_form_50_question.csv')
-    import_one_questionaire_answers('LOT_50.csv')
+    # save signals of every row are collected into one version bump at the end
+    with questionaire_definitions_batch():
+        import_one_questionaire_answers('IAAF_form_50_question.csv')
+        import_one_questionaire_answers('LOT_50.csv')
+
+        # scores are ready to use right after import
+        update_all_questionaires_min_max_score()
 # end def import_questionaire_answers()
 
 def import_default_users () :
@@ -172,6 +187,7 @@ def delete_investment_datas ():
     '''
     try:
         del_cnt, _ = InvestmentData.objects.all().delete()
+        mark_price_store_stale()
         return del_cnt
     except Exception as e:
         print(e)
@@ -204,14 +220,14 @@ def delete_investment_types ():
         return 0
 # end def delete_investment_types()
 
-def import_investment_datas ():
+def import_investment_types_and_choices ():
     '''
-    Import predefined questionaires and answers.
+    Import predefined investment_types and investment_choices.
+    Returns dictionary of investment_name : InvestmentChoice
+    for the fund columns in funds_daily csv.
     '''
-    # function to import investment_types, investment_choices and investment_datas
-    ### predefined files:
+    ### predefined file:
     ###     funds_name_type_desc.csv
-    ###     funds_daily_2015_to_2036.csv
 
     with open(
         DEFAULT_DATA_ROOT + '/' + 'funds_name_type_desc.csv',
@@ -241,39 +257,227 @@ def import_investment_datas ():
     i_choice_C, _ = InvestmentChoice.objects.get_or_create(investment_name = 'Fund_C')
     i_choice_D, _ = InvestmentChoice.objects.get_or_create(investment_name = 'Fund_D')
 
-    def create_one_investment_data (invesment_name, investment_choice, csv_row) :
-        # Django expects all datetimes to have an associated timezone 
-        # when USE_TZ is active to maintain consistency and prevent 
-        # issues with time calculations.  Otherwise, there will be a
-        # DateTimeField naive datetime RuntimeWarning.
-        date_string = csv_row['Date']
-        format_string = '%Y-%m-%d'
-        # Convert the string to a datetime object
-        naive_datetime_object = datetime.strptime(date_string, format_string)
-        # Make the datetime timezone-aware before assigning it
-        aware_datetime = timezone.make_aware(naive_datetime_object)
-        i_data, created = InvestmentData.objects.get_or_create(
-            investment_choice = investment_choice,
-            investment_date = aware_datetime,
-            investment_price = csv_row[invesment_name]
-        )
-        return i_data, created
-    # end def create_one_investment_data()
+    return {
+        'Fund_A' : i_choice_A,
+        'Fund_B' : i_choice_B,
+        'Fund_C' : i_choice_C,
+        'Fund_D' : i_choice_D,
+    }
+# end def import_investment_types_and_choices()
 
+def make_aware_csv_date (date_string) :
+    '''
+    Django expects all datetimes to have an associated timezone 
+    when USE_TZ is active to maintain consistency and prevent 
+    issues with time calculations.  Otherwise, there will be a
+    DateTimeField naive datetime RuntimeWarning.
+    '''
+    format_string = '%Y-%m-%d'
+    # Convert the string to a datetime object
+    naive_datetime_object = datetime.strptime(date_string, format_string)
+    # Make the datetime timezone-aware before assigning it
+    return timezone.make_aware(naive_datetime_object)
+# end def make_aware_csv_date()
 
-    with open(
-        DEFAULT_DATA_ROOT + '/' + 'funds_daily_2015_to_2036.csv',
-        mode='r', 
-        newline='', 
-        encoding='utf-8'
-    ) as csvfile:
-        csv_reader = DictReader(csvfile)
+def import_investment_datas ():
+    '''
+    Import predefined investment types, choices and daily prices.
+    Kept for existing callers, same as bulk_import_investment_datas().
+    '''
+    # function to import investment_types, investment_choices and investment_datas
+    ### predefined files:
+    ###     funds_name_type_desc.csv
+    ###     funds_daily_2015_to_2036.csv
 
-        for row in csv_reader:
-            create_one_investment_data('Fund_A', i_choice_A, row)
-            create_one_investment_data('Fund_B', i_choice_B, row)
-            create_one_investment_data('Fund_C', i_choice_C, row)
-            create_one_investment_data('Fund_D', i_choice_D, row)
-        # end for
-    # end with open()
+    return bulk_import_investment_datas()
 # end def import_investment_datas()
+
+def _bulk_create_investment_datas (batch) :
+    '''
+    bulk_create() of InvestmentData rows with ignore_conflicts,
+    rows a concurrent import already added are skipped by the database.
+    ignore_conflicts does not report what was skipped, so the rows in
+    the batch's (choice, date) range are counted before and after.
+    Returns the number of rows actually inserted.
+    '''
+    batch_rows = InvestmentData.objects.filter(
+        investment_choice_id__in = {data.investment_choice_id for data in batch},
+        investment_date__gte = min(data.investment_date for data in batch),
+        investment_date__lte = max(data.investment_date for data in batch),
+    )
+
+    count_before = batch_rows.count()
+    InvestmentData.objects.bulk_create(batch, ignore_conflicts=True)
+
+    return batch_rows.count() - count_before
+# end def _bulk_create_investment_datas()
+
+def bulk_import_investment_datas (batch_size=2000):
+    '''
+    Bulk import of predefined investment types, choices and daily prices.
+    Streams funds_daily csv and inserts InvestmentData with bulk_create()
+    in batches, all inside one transaction.
+    Rows already in the table (same choice and date) are skipped,
+    using one query to fetch the existing keys for the counts.
+    The unique (choice, date) constraint makes concurrent imports safe,
+    rows a concurrent import added first count as skipped.
+    Returns (inserted record count, skipped record count).
+    '''
+    inserted_count = 0
+    skipped_count = 0
+
+    with transaction.atomic():
+        investment_choices = import_investment_types_and_choices()
+
+        # one query for all (choice, date) already loaded
+        existing_keys = set(
+            InvestmentData.objects.filter(
+                investment_choice__in = investment_choices.values()
+            ).values_list(
+                'investment_choice_id',
+                'investment_date',
+            )
+        )
+
+        batch = []
+
+        with open(
+            DEFAULT_DATA_ROOT + '/' + 'funds_daily_2015_to_2036.csv',
+            mode='r', 
+            newline='', 
+            encoding='utf-8'
+        ) as csvfile:
+            csv_reader = DictReader(csvfile)
+
+            for row in csv_reader:
+                aware_datetime = make_aware_csv_date(row['Date'])
+
+                for investment_name, investment_choice in investment_choices.items():
+                    if (investment_choice.id, aware_datetime) in existing_keys:
+                        skipped_count += 1
+                        continue
+
+                    batch.append(
+                        InvestmentData(
+                            investment_choice   = investment_choice,
+                            investment_date     = aware_datetime,
+                            investment_price    = float(row[investment_name]),
+                        )
+                    )
+
+                if len(batch) >= batch_size:
+                    batch_inserted_count = _bulk_create_investment_datas(batch)
+                    inserted_count += batch_inserted_count
+                    skipped_count += len(batch) - batch_inserted_count
+                    batch = []
+            # end for
+        # end with open()
+
+        if batch:
+            batch_inserted_count = _bulk_create_investment_datas(batch)
+            inserted_count += batch_inserted_count
+            skipped_count += len(batch) - batch_inserted_count
+    # end with transaction.atomic()
+
+    # bulk_create() does not send post_save signals
+    mark_price_store_stale()
+
+    return inserted_count, skipped_count
+# end def bulk_import_investment_datas()
+
+def import_new_investment_datas (filename='funds_daily_2015_to_2036.csv', batch_size=2000):
+    '''
+    Incremental import of daily prices for the nightly refresh.
+    Finds the latest investment_date of every fund with one query
+    and only parses / inserts csv rows after that date.
+    Fund columns not yet in investment_choices are created
+    and all their rows are imported.
+    Returns (inserted record count, list of new fund names).
+    '''
+    inserted_count = 0
+    new_fund_names = []
+
+    csv_path = DEFAULT_DATA_ROOT + '/' + filename
+
+    # read only the header line for the fund columns
+    with open(csv_path, mode='r', newline='', encoding='utf-8') as csvfile:
+        header = next(csv_reader_lists(csvfile))
+
+    fund_names = [column for column in header if column != 'Date']
+
+    with transaction.atomic():
+        investment_choices = {}
+
+        for investment_choice in InvestmentChoice.objects.filter(investment_name__in = fund_names):
+            investment_choices.setdefault(investment_choice.investment_name, investment_choice)
+
+        for fund_name in fund_names:
+            if fund_name not in investment_choices:
+                investment_choices[fund_name] = InvestmentChoice.objects.create(investment_name = fund_name)
+                new_fund_names.append(fund_name)
+
+        # one query for the latest date of every fund
+        last_datetimes = InvestmentData.objects.filter(
+            investment_choice__in = investment_choices.values()
+        ).values(
+            'investment_choice_id'
+        ).annotate(
+            last_date = Max('investment_date')
+        )
+
+        # csv dates are 'YYYY-MM-DD' strings, which compare in date order
+        last_date_strs = {
+            row['investment_choice_id'] : timezone.localtime(row['last_date']).strftime('%Y-%m-%d')
+            for row in last_datetimes
+        }
+
+        fund_last_date_strs = {
+            fund_name : last_date_strs.get(investment_choice.id, '')
+            for fund_name, investment_choice in investment_choices.items()
+        }
+
+        min_last_date_str = min(fund_last_date_strs.values(), default='')
+
+        batch = []
+
+        with open(csv_path, mode='r', newline='', encoding='utf-8') as csvfile:
+            csv_reader = DictReader(csvfile)
+
+            for row in csv_reader:
+                date_string = row['Date']
+
+                # already loaded for every fund, skip without parsing
+                if date_string <= min_last_date_str:
+                    continue
+
+                aware_datetime = make_aware_csv_date(date_string)
+
+                for fund_name, investment_choice in investment_choices.items():
+                    price = row[fund_name]
+
+                    if date_string <= fund_last_date_strs[fund_name] or not price:
+                        continue
+
+                    batch.append(
+                        InvestmentData(
+                            investment_choice   = investment_choice,
+                            investment_date     = aware_datetime,
+                            investment_price    = float(price),
+                        )
+                    )
+
+                if len(batch) >= batch_size:
+                    inserted_count += _bulk_create_investment_datas(batch)
+                    batch = []
+            # end for
+        # end with open()
+
+        if batch:
+            inserted_count += _bulk_create_investment_datas(batch)
+    # end with transaction.atomic()
+
+    # bulk_create() does not send post_save signals
+    mark_price_store_stale()
+
+    return inserted_count, new_fund_names
+# end def import_new_investment_datas()
@@ -5,7 +5,8 @@ from .utils import import_default_users
 from .utils import import_questionaire_answers
 from .utils import delete_questionaire_answers
 from .utils import delete_questionaires
-from .utils import import_investment_datas
+from .utils import bulk_import_investment_datas
+from .utils import import_new_investment_datas
 from .utils import delete_investment_datas
 from .utils import delete_investment_choices
 from .utils import delete_investment_types
@@ -86,7 +87,6 @@ def func_delete_default_questionaire_data (request):
 # end def func_delete_default_questionaire_data()
 
 def func_import_default_investment_datas (request):
-    ### 30688
     if not request.user.is_authenticated:
         return redirect('/')
 
@@ -94,13 +94,38 @@ def func_import_default_investment_datas (request):
         return redirect('/')
 
     if request.method == 'POST':
-        import_investment_datas()
+        inserted_count, skipped_count = bulk_import_investment_datas()
         ## add alert message
-        messages.success(request, 'Default investment data imported successfully.')
+        messages.success(
+            request,
+            f'Default investment data imported successfully. '
+            f'{inserted_count} records inserted, {skipped_count} records skipped.'
+        )
 
     return redirect('app_import_data:djep_import_index')
 # end def func_import_default_investment_datas()
 
+def func_import_new_investment_datas (request):
+    if not request.user.is_authenticated:
+        return redirect('/')
+
+    if not request.user.username == 'admin':
+        return redirect('/')
+
+    if request.method == 'POST':
+        inserted_count, new_fund_names = import_new_investment_datas()
+        ## add alert message
+        if inserted_count > 0:
+            messages.success(request, f'{inserted_count} new investment data records imported successfully.')
+        else:
+            messages.info(request, 'No new investment data to import.')
+
+        if new_fund_names:
+            messages.info(request, 'New investment choices added: ' + ', '.join(new_fund_names))
+
+    return redirect('app_import_data:djep_import_index')
+# end def func_import_new_investment_datas()
+
 def func_delete_default_investment_datas (request):
     if not request.user.is_authenticated:
         return redirect('/')
@@ -0,0 +1,179 @@
+# analytics.py - Risk and performance metrics of the funds over the daily price store
+#
+# Everything is vectorised over the daily series and over funds. Results are
+# cached per (funds, window, as-of date, price data version), so showing them
+# on the fund pages costs a dictionary lookup after the first request.
+
+import numpy as np
+import pandas as pd
+
+from investment_datas.price_store import get_price_store
+from .chart_cache import ChartCache
+from .charts import short_names
+from .periods import PERIOD_CHOICES, period_start_date
+
+# Money market fund, its daily return stands in for the risk-free rate
+RISK_FREE_FUND = 'Fund_D'
+
+# Days in the rolling correlation window
+ROLLING_CORRELATION_DAYS = 90
+
+# Periods shown on the fund detail page
+SUMMARY_PERIODS = ['Past_12_months', 'Past_36_months', 'Past_60_months', 'Past_since_2016']
+
+analytics_cache = ChartCache(max_size=256)
+
+
+def _window(price_store, period, as_of):
+    """(i_start, i_end) rows of period ending at the last trading day on or before as_of, or None."""
+    i_end = price_store.resolve_date_index(as_of if as_of is not None else pd.Timestamp.today(), side='before')
+    if i_end is None:
+        return None
+    end_date = pd.Timestamp(price_store.dates[i_end]).to_pydatetime()
+    i_start = price_store.resolve_date_index(period_start_date(end_date, period), side='after')
+    if i_start is None or i_start >= i_end:
+        return None
+    return i_start, i_end
+
+
+def _periods_per_year(days):
+    """Observations per year of a datetime64[D] series (365 for calendar-daily prices)."""
+    return 365.25 / np.mean(np.diff(days.astype('int64')))
+
+
+def _to_float(value):
+    value = float(value)
+    return None if not np.isfinite(value) else value
+
+
+def _compute_risk_metrics(price_store, fund_names, i_start, i_end):
+    cols = [price_store.fund_index[name] for name in fund_names]
+    prices = price_store.values[i_start:i_end + 1, cols]
+    dates = price_store.dates[i_start:i_end + 1]
+    day_numbers = dates.astype('int64')
+    ppy = _periods_per_year(dates)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        returns = prices[1:] / prices[:-1] - 1
+        volatility = np.nanstd(returns, axis=0, ddof=1) * np.sqrt(ppy)
+
+        # Drawdown from the running peak; its duration runs from the peak to recovery (or the as-of date)
+        peak = np.fmax.accumulate(prices, axis=0)
+        drawdown = prices / peak - 1
+        trough = np.nanargmin(np.where(np.isnan(drawdown), np.inf, drawdown), axis=0)
+
+        if price_store.has_fund(RISK_FREE_FUND):
+            rf = price_store.values[i_start:i_end + 1, price_store.fund_index[RISK_FREE_FUND]]
+            risk_free = rf[1:] / rf[:-1] - 1
+        else:
+            risk_free = np.zeros(len(returns))
+        excess = returns - risk_free[:, None]
+        mean_excess = np.nanmean(excess, axis=0)
+        excess_std = np.nanstd(excess, axis=0, ddof=1)
+        downside = np.sqrt(np.nanmean(np.minimum(excess, 0) ** 2, axis=0))
+        sharpe = np.where(excess_std > 1e-12, mean_excess / excess_std * np.sqrt(ppy), np.nan)
+        sortino = np.where(downside > 1e-12, mean_excess / downside * np.sqrt(ppy), np.nan)
+
+    metrics = {}
+    for f, name in enumerate(fund_names):
+        t = trough[f]
+        peak_value = peak[t, f]
+        peak_row = int(np.flatnonzero(prices[:t + 1, f] >= peak_value)[-1]) if np.isfinite(peak_value) else t
+        recovered_rows = np.flatnonzero(prices[t + 1:, f] >= peak_value)
+        recovery_row = t + 1 + int(recovered_rows[0]) if len(recovered_rows) else None
+        end_row = recovery_row if recovery_row is not None else len(prices) - 1
+
+        metrics[name] = {
+            'start': str(dates[0]),
+            'end': str(dates[-1]),
+            'return_pct': _to_float((prices[-1, f] / prices[0, f] - 1) * 100) if prices[0, f] else 0.0,
+            'volatility_pct': _to_float(volatility[f] * 100),
+            'max_drawdown_pct': _to_float(drawdown[t, f] * 100),
+            'drawdown_peak': str(dates[peak_row]),
+            'drawdown_trough': str(dates[t]),
+            'drawdown_recovery': str(dates[recovery_row]) if recovery_row is not None else None,
+            'drawdown_days': int(day_numbers[end_row] - day_numbers[peak_row]),
+            'sharpe': _to_float(sharpe[f]),
+            'sortino': _to_float(sortino[f]),
+        }
+    return metrics
+
+
+def risk_metrics(fund_names, period='Past_12_months', as_of=None):
+    """{fund_name: metrics dict} over period ending at as_of (default today), {} if there is no data.
+
+    metrics: start, end, return_pct, volatility_pct (annualised), max_drawdown_pct,
+    drawdown_peak / trough / recovery dates, drawdown_days (peak to recovery or end),
+    sharpe and sortino (annualised, excess over RISK_FREE_FUND).
+    """
+    price_store = get_price_store()
+    fund_names = tuple(name for name in fund_names if price_store.has_fund(name))
+    window = _window(price_store, period, as_of)
+    if not fund_names or window is None:
+        return {}
+    key = ('risk', fund_names, period, str(price_store.dates[window[1]]), price_store.version)
+    return analytics_cache.get_or_build(key, lambda: _compute_risk_metrics(price_store, fund_names, *window))
+
+
+def _compute_rolling_correlation(price_store, fund_names, i_start, i_end, days):
+    cols = [price_store.fund_index[name] for name in fund_names]
+    # Include the days before the period start so the first window is full
+    first = max(0, i_start - days)
+    prices = price_store.values[first:i_end + 1, cols]
+    returns = prices[1:] / prices[:-1] - 1
+    returns = np.nan_to_num(returns)
+    if len(returns) < days:
+        return np.array([], dtype='datetime64[D]'), np.empty((0, len(cols), len(cols)))
+
+    # Window sums from cumulative sums, every window at once
+    zero = np.zeros((1,) + returns.shape[1:])
+    s1 = np.concatenate((zero, np.cumsum(returns, axis=0)))
+    outer = returns[:, :, None] * returns[:, None, :]
+    s2 = np.concatenate((zero[:, :, None] * zero[:, None, :], np.cumsum(outer, axis=0)))
+    window_sum = s1[days:] - s1[:-days]
+    window_outer = s2[days:] - s2[:-days]
+
+    cov = (window_outer - window_sum[:, :, None] * window_sum[:, None, :] / days) / (days - 1)
+    std = np.sqrt(np.clip(np.diagonal(cov, axis1=1, axis2=2), 0, None))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        corr = cov / (std[:, :, None] * std[:, None, :])
+
+    # Window k ends at returns row days - 1 + k, i.e. price row first + days + k
+    end_rows = first + days + np.arange(len(corr))
+    keep = end_rows >= i_start
+    return price_store.dates[end_rows[keep]], np.clip(corr[keep], -1, 1)
+
+
+def rolling_correlation(fund_names, period='Past_12_months', as_of=None, days=ROLLING_CORRELATION_DAYS):
+    """(dates, corr) with corr[t] the correlation matrix of daily returns over the days ending at dates[t].
+
+    fund_names gives the matrix order; dates cover period ending at as_of (default today).
+    """
+    price_store = get_price_store()
+    fund_names = tuple(name for name in fund_names if price_store.has_fund(name))
+    window = _window(price_store, period, as_of)
+    if len(fund_names) < 2 or window is None:
+        return np.array([], dtype='datetime64[D]'), np.empty((0, len(fund_names), len(fund_names)))
+    key = ('correlation', fund_names, period, days, str(price_store.dates[window[1]]), price_store.version)
+    return analytics_cache.get_or_build(key, lambda: _compute_rolling_correlation(price_store, fund_names, *window, days))
+
+
+def fund_analytics_summary(fund_name, fund_names, as_of=None):
+    """Rows of the fund detail page: metrics of fund_name per SUMMARY_PERIODS, and its latest correlations."""
+    rows = []
+    for period in SUMMARY_PERIODS:
+        metrics = risk_metrics([fund_name], period, as_of).get(fund_name)
+        if metrics:
+            rows.append(dict(metrics, period=PERIOD_CHOICES[period]))
+
+    correlations = []
+    price_store = get_price_store()
+    fund_names = [name for name in fund_names if price_store.has_fund(name)]
+    dates, corr = rolling_correlation(fund_names, 'Past_12_months', as_of)
+    if len(dates) and fund_name in fund_names:
+        i = fund_names.index(fund_name)
+        correlations = [
+            {'fund': name, 'label': short_names.get(name, name), 'value': _to_float(corr[-1, i, j])}
+            for j, name in enumerate(fund_names) if name != fund_name
+        ]
+    return {'rows': rows, 'correlations': correlations, 'correlation_end': str(dates[-1]) if len(dates) else None}
@@ -0,0 +1,58 @@
+# chart_batch.py - Worker side of the build_fund_charts management command
+#
+# Renders the same files chart_builder serves, the command passes their paths.
+# Kept free of Django imports so pool workers start fast with any start method.
+# The price array is placed in shared memory by the command; every worker
+# attaches to it once in init_worker() instead of re-reading the CSV.
+
+import os
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .charts import build_fund_chart, write_html_atomic
+
+# Set in each worker by init_worker()
+_df = None
+_shm = None
+
+
+def share_prices(frame):
+    """Copy the price values into a new SharedMemory block.
+
+    Returns (shm, init_args); pass init_args to init_worker(). The caller
+    must close() and unlink() shm when the pool is done.
+    """
+    values = np.ascontiguousarray(frame.to_numpy(dtype='float64'))
+    shm = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+    np.ndarray(values.shape, dtype=values.dtype, buffer=shm.buf)[:] = values
+    init_args = (shm.name, values.shape, frame.index.values.astype('datetime64[ns]'), list(frame.columns))
+    return shm, init_args
+
+
+def init_worker(shm_name, shape, dates, columns):
+    """Pool initializer: build the worker's DataFrame on top of the shared block (no copy)."""
+    global _df, _shm
+    try:
+        # Python 3.13+: the parent process owns the block, do not track it here
+        _shm = shared_memory.SharedMemory(name=shm_name, track=False)
+    except TypeError:
+        _shm = shared_memory.SharedMemory(name=shm_name)
+    values = np.ndarray(shape, dtype='float64', buffer=_shm.buf)
+    _df = pd.DataFrame(values, index=pd.DatetimeIndex(dates, name='Date'), columns=columns, copy=False)
+
+
+def init_local(frame):
+    """Same as init_worker() for running in the calling process."""
+    global _df
+    _df = frame
+
+
+def render_chart(path, kind, fund_key, period, as_of):
+    """Render one chart into path. Returns (file name, seconds)."""
+    started = time.perf_counter()
+    fig = build_fund_chart(_df, kind, fund_key, period, pd.Timestamp(as_of))
+    write_html_atomic(path, fig.to_html(full_html=True, include_plotlyjs='cdn'))
+    return os.path.basename(path), time.perf_counter() - started
@@ -0,0 +1,164 @@
+# chart_builder.py - On-demand build of the FundCharts_Store chart files
+#
+# A chart is identified by (kind, fund_key, period, as_of). The first request
+# renders it with charts.build_fund_chart() and writes it to
+#     MEDIA_ROOT/FundCharts_Store/<price data version>/<file name>
+# Later requests read the file. When the price data changes, a file of an
+# older version is served while a background thread renders the new one.
+# manage.py build_fund_charts renders the same files ahead of the requests.
+
+import os
+import glob
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from django.conf import settings
+from django.urls import reverse
+
+from investment_datas.price_store import get_price_store
+from .charts import CHART_KINDS, build_fund_chart, fund_map, write_html_atomic
+from .periods import PERIOD_CHOICES
+from .returns_table import get_ready_returns_table
+
+CHART_STORE_ROOT = os.path.join(settings.MEDIA_ROOT, 'FundCharts_Store')
+
+# One background rebuild at a time, charts of a page are requested together
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chart_builder')
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def is_valid_chart(kind, fund_key, period):
+    if kind not in CHART_KINDS or period not in PERIOD_CHOICES:
+        return False
+    if kind == 'bar':
+        return fund_key == 'ALL'
+    return fund_key == 'ALL' or fund_key in fund_map
+
+
+def chart_file_name(kind, fund_key, period, as_of_str):
+    """File name of a stored chart, e.g. A_Past_since_2016_to_2025-12-31.html or Bar_ALL_Since_2020_to_2025-12-31.html."""
+    prefix = {'line': '', 'bar': 'Bar_'}[kind]
+    return f"{prefix}{fund_key}_{period}_to_{as_of_str}.html"
+
+
+def resolve_as_of(price_store, as_of=None):
+    """Last trading day on or before as_of (default today), or None."""
+    if as_of is None:
+        as_of = pd.Timestamp.today()
+    return price_store.resolve_date(as_of, side='before')
+
+
+def chart_url(kind, fund_key, period, as_of=None):
+    """URL of a chart for templates; includes the price data version so it can be cached forever."""
+    price_store = get_price_store()
+    as_of = resolve_as_of(price_store, as_of)
+    if as_of is None:
+        return ''
+    return reverse('invest_reviews:fund_chart', kwargs={
+        'version': price_store.version,
+        'kind': kind,
+        'fund_key': fund_key,
+        'period': period,
+        'as_of': as_of.strftime('%Y-%m-%d'),
+    })
+
+
+def chart_file_path(version, kind, fund_key, period, as_of):
+    """Path of a stored chart of the price data version."""
+    return os.path.join(CHART_STORE_ROOT, version, chart_file_name(kind, fund_key, period, as_of.strftime('%Y-%m-%d')))
+
+
+def remove_older_versions(path):
+    """Remove the files of other price data versions of the chart stored at path."""
+    for old_path in glob.glob(os.path.join(CHART_STORE_ROOT, '*', os.path.basename(path))):
+        if old_path != path:
+            try:
+                os.remove(old_path)
+            except OSError:
+                pass
+
+
+def _build(price_store, kind, fund_key, period, as_of):
+    """Render one chart for price_store.version and remove its files of older versions."""
+    path = chart_file_path(price_store.version, kind, fund_key, period, as_of)
+    # Bar values from the returns table when it is ready, build_fund_chart() computes them otherwise
+    returns_table = get_ready_returns_table() if kind == 'bar' else None
+    if returns_table is not None and returns_table.version != price_store.version:
+        returns_table = None
+    fig = build_fund_chart(price_store.frame, kind, fund_key, period, as_of, returns_table)
+    write_html_atomic(path, fig.to_html(full_html=True, include_plotlyjs='cdn'))
+    remove_older_versions(path)
+    return path
+
+
+def _rebuild_in_background(kind, fund_key, period, as_of):
+    key = (kind, fund_key, period, as_of)
+    with _pending_lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+
+    def run():
+        try:
+            _build(get_price_store(), kind, fund_key, period, as_of)
+        finally:
+            with _pending_lock:
+                _pending.discard(key)
+
+    _executor.submit(run)
+
+
+def _newest_existing(paths):
+    """Most recently modified of paths, skipping files removed since they were listed, or None."""
+    newest_path, newest_mtime = None, None
+    for path in paths:
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            continue
+        if newest_mtime is None or mtime > newest_mtime:
+            newest_path, newest_mtime = path, mtime
+    return newest_path
+
+
+def get_chart_file(kind, fund_key, period, as_of):
+    """Return (path, is_current) of the chart file, building it first if there is none.
+
+    is_current is False when an older version's file is returned while the
+    current one is being rebuilt in the background.
+    """
+    price_store = get_price_store()
+    as_of = resolve_as_of(price_store, as_of)
+    if as_of is None:
+        return None, False
+
+    file_name = chart_file_name(kind, fund_key, period, as_of.strftime('%Y-%m-%d'))
+    path = os.path.join(CHART_STORE_ROOT, price_store.version, file_name)
+    if os.path.exists(path):
+        return path, True
+
+    # Pick the stale file before the rebuild starts, the rebuild removes it
+    stale_path = _newest_existing(glob.glob(os.path.join(CHART_STORE_ROOT, '*', file_name)))
+    if stale_path is not None:
+        _rebuild_in_background(kind, fund_key, period, as_of)
+        return stale_path, False
+
+    return _build(price_store, kind, fund_key, period, as_of), True
+
+
+def open_chart_file(kind, fund_key, period, as_of):
+    """Return (open binary file, is_current) of the chart, or (None, False) if there is no data.
+
+    An older version's file from get_chart_file() can be removed by the
+    background rebuild before it is opened; the chart is then built here.
+    """
+    path, is_current = get_chart_file(kind, fund_key, period, as_of)
+    if path is None:
+        return None, False
+    try:
+        return open(path, 'rb'), is_current
+    except FileNotFoundError:
+        price_store = get_price_store()
+        return open(_build(price_store, kind, fund_key, period, resolve_as_of(price_store, as_of)), 'rb'), True
@@ -0,0 +1,64 @@
+# chart_cache.py - LRU cache of rendered portfolio chart HTML fragments
+
+import threading
+from collections import OrderedDict
+
+# Number of rendered (port_div, pie_div) pairs kept per process
+CHART_CACHE_SIZE = 128
+
+
+class ChartCache:
+    """Thread safe LRU mapping of key -> rendered chart fragments, bounded by max_size."""
+
+    def __init__(self, max_size=CHART_CACHE_SIZE):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def set(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def get_or_build(self, key, build):
+        """Return the cached value of key, or build(), store and return it."""
+        value = self.get(key)
+        if value is None:
+            value = build()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+portfolio_chart_cache = ChartCache()
+
+
+def portfolio_chart_key(start_date, current_date, invested_amount, weights, price_version):
+    """Cache key of one portfolio request.
+
+    Dates are the resolved trading days and the amount is rounded to cents, so
+    requests that differ only in a non-trading day or a fraction of a cent share
+    one entry. The price data version drops entries when prices change.
+    """
+    return (
+        start_date.strftime('%Y-%m-%d'),
+        current_date.strftime('%Y-%m-%d'),
+        round(float(invested_amount), 2),
+        tuple((fund_col, round(weight * 100)) for fund_col, weight in sorted(weights.items())),
+        price_version,
+    )
@@ -0,0 +1,52 @@
+# chart_data.py - Compact JSON chart series for static/js/fund_charts.js
+#
+# Dates are sent as int32 day offsets from base_day (days since 1970-01-01)
+# and values as float32, both little-endian and base64 encoded. A daily
+# series of ten years is about 20 KB instead of several hundred KB of
+# Plotly JSON.
+
+import base64
+
+import numpy as np
+
+# Upper bound of points per series a client may ask for
+MAX_POINTS_LIMIT = 5000
+
+
+def encode_days(dates):
+    """Return (base_day, base64 int32 offsets) of a datetime64[D] array."""
+    days = np.asarray(dates, dtype='datetime64[D]').astype('int64')
+    base_day = int(days[0]) if len(days) else 0
+    offsets = (days - base_day).astype('<i4')
+    return base_day, base64.b64encode(offsets.tobytes()).decode('ascii')
+
+
+def encode_values(values):
+    """Base64 of a float array as little-endian float32, NaN kept."""
+    return base64.b64encode(np.asarray(values, dtype='<f4').tobytes()).decode('ascii')
+
+
+def downsample_indices(n, max_points):
+    """Evenly spaced indices into n points, always keeping the first and last one."""
+    if not max_points or n <= max_points:
+        return np.arange(n)
+    max_points = max(2, min(int(max_points), MAX_POINTS_LIMIT))
+    return np.unique(np.linspace(0, n - 1, max_points).round().astype('int64'))
+
+
+def series_payload(dates, series, max_points=None):
+    """JSON payload of several series sharing one date axis.
+
+    series is a list of (name, label, values array), all as long as dates.
+    """
+    idx = downsample_indices(len(dates), max_points)
+    base_day, days = encode_days(np.asarray(dates)[idx])
+    return {
+        'base_day': base_day,
+        'days': days,
+        'length': int(len(idx)),
+        'series': [
+            {'name': name, 'label': label, 'values': encode_values(np.asarray(values)[idx])}
+            for name, label, values in series
+        ],
+    }
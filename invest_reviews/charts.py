@@ -0,0 +1,124 @@
+# charts.py - Plotly figures of fund prices (line and bar charts)
+#
+# Used by the views and by the chart build service (chart_builder.py);
+# same figures as project_info/Howard/Chart_Return_Plotly.py
+
+import os
+import tempfile
+import plotly.graph_objects as go
+import plotly.express as px
+import pandas as pd
+
+# LTTB downsampling of long daily series before plotting
+from .downsample import downsample_series
+from .periods import PERIOD_CHOICES, period_start_date
+
+# Fund mappings
+short_names = {
+    'Fund_A': 'Fund A',
+    'Fund_B': 'Fund B',
+    'Fund_C': 'Fund C',
+    'Fund_D': 'Fund D'
+}
+
+long_names = {
+    'Fund_A': 'Conviction Growth Fund (A)',
+    'Fund_B': 'Diversified Assets Fund (B)',
+    'Fund_C': 'Balanced Horizon Fund (C)',
+    'Fund_D': 'Money Market Fund (D)'
+}
+
+fund_map = {'A': 'Fund_A', 'B': 'Fund_B', 'C': 'Fund_C', 'D': 'Fund_D'}
+
+def calculate_pct_change(start_val, end_val):
+    return ((end_val - start_val) / start_val) * 100 if start_val != 0 else 0
+
+def create_l_chart(data, fund_cols, title, start_date, current_date, is_combined=False):
+    fig = go.Figure()
+    pct_text = ''
+    if is_combined:
+        for col in fund_cols:
+            short_name = short_names.get(col, col)
+            x, y = downsample_series(data.index, data[col].to_numpy())
+            fig.add_trace(go.Scatter(x=x, y=y, mode='lines', name=short_name))
+        pct_text = '<br>'.join([f"{short_names.get(col, col)}: {calculate_pct_change(data[col].iloc[0], data[col].iloc[-1]):.2f}%" for col in fund_cols])
+        legend_text = "<b>Fund Mapping:</b><br>" + "<br>".join([f"{long_names[col]}" for col in fund_cols])
+        fig.update_layout(title=title, xaxis_title='Year', yaxis_title='Value', yaxis=dict(range=[0, None]), legend=dict(x=0, y=1.1, orientation='h'))
+        fig.add_annotation(x=0.02, y=0.95, text=legend_text, showarrow=False, xref='paper', yref='paper', align='left', bgcolor='rgba(255,255,255,0.8)', bordercolor='black', borderwidth=1, font=dict(size=11))
+    else:
+        col = fund_cols[0]
+        long_name = long_names.get(col, col)
+        x, y = downsample_series(data.index, data[col].to_numpy())
+        fig.add_trace(go.Scatter(x=x, y=y, mode='lines', name=long_name))
+        pct_change = calculate_pct_change(data[col].iloc[0], data[col].iloc[-1])
+        pct_text = f"Percentage Change: {pct_change:.2f}%"
+        if col == 'Fund_D':
+            min_val = data[col].min()
+            max_val = data[col].max()
+            buffer = (max_val - min_val) * 0.05
+            y_min = max(80, min_val * 0.98)
+            y_max = max_val + buffer
+            fig.update_layout(title=title, xaxis_title='Year', yaxis_title='Value', yaxis=dict(range=[y_min, y_max]))
+        else:
+            fig.update_layout(title=title, xaxis_title='Year', yaxis_title='Value', yaxis=dict(range=[0, None]))
+    days_diff = (current_date - start_date).days
+    if days_diff > 365:
+        fig.update_xaxes(dtick='M12', tickformat='%Y', showline=True, linewidth=1.5, linecolor='black', gridcolor='lightgray')
+    else:
+        fig.update_xaxes(dtick='M3', tickformat='%Y %b', showline=True, linewidth=1.5, linecolor='black', gridcolor='lightgray')
+    fig.update_xaxes(zeroline=False)
+    fig.add_annotation(x=1.05, y=0.5, text=pct_text, showarrow=False, xref='paper', yref='paper', align='left', font=dict(size=12))
+    fig.update_layout(width=900, height=600, margin=dict(l=220, r=220))
+    return fig
+
+def create_b_chart(pct_changes, title):
+    renamed_changes = {short_names.get(k, k): v for k, v in pct_changes.items()}
+    bar_df = pd.DataFrame({'Fund': list(renamed_changes.keys()), 'Percentage Change': list(renamed_changes.values())})
+    fig = px.bar(bar_df, x='Fund', y='Percentage Change', title=title)
+    fig.update_yaxes(range=[0, None])
+    return fig
+
+# Chart kinds of the chart build service
+CHART_KINDS = ('line', 'bar')
+
+def build_fund_chart(df, kind, fund_key, period, as_of, returns_table=None):
+    """Figure of one stored chart.
+
+    kind          - 'line' or 'bar' (bar only for fund_key 'ALL')
+    fund_key      - 'A'..'D' or 'ALL'
+    period        - a key of PERIOD_CHOICES
+    as_of         - pd.Timestamp of a trading day in df
+    returns_table - ReturnsTable of df; bar values are read from it when given
+    """
+    as_of_str = as_of.strftime('%Y-%m-%d')
+    label = PERIOD_CHOICES[period]
+    start_date = pd.Timestamp(period_start_date(as_of.to_pydatetime(), period))
+    data = df.loc[start_date:as_of]
+    
+    if fund_key == 'ALL':
+        fund_cols = [col for col in fund_map.values() if col in df.columns]
+        if kind == 'bar':
+            pct_changes = None
+            if returns_table is not None:
+                pct_changes = returns_table.period_returns(period, returns_table.row(as_of), fund_cols)
+            if pct_changes is None:
+                pct_changes = {col: calculate_pct_change(data[col].iloc[0], data[col].iloc[-1]) for col in fund_cols}
+            return create_b_chart(pct_changes, f"Percentage Change All Funds {label} to {as_of_str}")
+        return create_l_chart(data, fund_cols, f"All Funds {label} to {as_of_str}", start_date, as_of, is_combined=True)
+    
+    fund_col = fund_map[fund_key]
+    title = f"{short_names[fund_col]} {label} to {as_of_str}"
+    return create_l_chart(data[[fund_col]], [fund_col], title, start_date, as_of)
+
+def write_html_atomic(path, html):
+    """Write html to path through a temp file and os.replace(), readers never see a partial file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(html)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
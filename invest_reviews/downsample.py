@@ -0,0 +1,62 @@
+# downsample.py - Largest-Triangle-Three-Buckets downsampling of chart series
+
+import numpy as np
+
+# Points per trace, about one per pixel of the 900px wide charts
+CHART_MAX_POINTS = 1000
+
+
+def lttb_indices(x, y, threshold):
+    """Indices of the points LTTB keeps out of (x, y), first and last point always kept.
+
+    Points are split into threshold - 2 buckets; from each bucket the point
+    forming the largest triangle with the previously kept point and the average
+    of the next bucket is kept, so peaks and troughs survive.
+    Series with NaN are thinned evenly instead.
+    """
+    n = len(y)
+    if threshold is None or threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    if np.isnan(y).any():
+        return np.unique(np.linspace(0, n - 1, threshold).round().astype('int64'))
+
+    # Bucket i covers points edges[i] .. edges[i + 1] - 1, inner points only
+    edges = np.linspace(1, n - 1, threshold - 1).astype('int64')
+
+    kept = np.empty(threshold, dtype='int64')
+    kept[0] = 0
+    kept[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        start, end = edges[i], edges[i + 1]
+
+        # Average of the next bucket, the last point for the last bucket
+        next_start, next_end = end, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        area = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+
+    return kept
+
+
+def downsample_series(dates, values, threshold=CHART_MAX_POINTS):
+    """Return (dates, values) of one trace reduced to threshold points with LTTB.
+
+    dates is a DatetimeIndex / datetime64 array; the start and end values are
+    kept exactly, so percentage changes read off the chart do not move.
+    """
+    dates = np.asarray(dates)
+    values = np.asarray(values)
+    x = dates.astype('datetime64[D]').astype('int64')
+    idx = lttb_indices(x, values, threshold)
+    return dates[idx], values[idx]
@@ -0,0 +1,109 @@
+# build_fund_charts.py - Pre-generate the FundCharts_Store chart files in parallel
+#
+#   python manage.py build_fund_charts
+#   python manage.py build_fund_charts --funds A ALL --periods Past_12_months Since_2020 --as-of 2025-12-31 --workers 4
+#
+# Replaces running illustrate_return() of project_info/Howard/Chart_Return_Plotly.py by hand.
+# Charts go into the store fund_chart_view serves (chart_builder.CHART_STORE_ROOT/<price data
+# version>/), so run it after a price update and no visitor waits for a chart build.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from investment_datas.price_store import get_price_store
+from invest_reviews.charts import fund_map
+from invest_reviews.periods import PERIOD_CHOICES
+from invest_reviews import chart_batch
+from invest_reviews.chart_builder import CHART_STORE_ROOT, chart_file_name, remove_older_versions
+
+# Same set as illustrate_return(): single funds since 2016 / this year, combined and bar charts for four periods
+DEFAULT_FUNDS = ['A', 'B', 'C', 'D', 'ALL']
+DEFAULT_PERIODS = ['Past_since_2016', 'Since_2020', 'Since_2023', 'Past_since_this_year']
+DEFAULT_SINGLE_FUND_PERIODS = ['Past_since_2016', 'Past_since_this_year']
+
+
+class Command(BaseCommand):
+    help = "Render fund line / bar charts for funds x periods x as-of dates into the served chart store, CHART_STORE_ROOT/<price data version> (MEDIA_ROOT/FundCharts_Store/<price data version>)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--funds', nargs='+', choices=list(fund_map) + ['ALL'],
+                            help="Funds to chart, ALL for the combined and bar charts (default: A B C D ALL)")
+        parser.add_argument('--periods', nargs='+', choices=list(PERIOD_CHOICES),
+                            help="Periods to chart (default: the illustrate_return() set)")
+        parser.add_argument('--as-of', nargs='+', dest='as_of', default=None,
+                            help="As-of dates YYYY-MM-DD, each moved to the last trading day on or before it (default: today)")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes (default: CPU count, 1 renders in this process)")
+        parser.add_argument('--output', default=None,
+                            help="Output folder (default: the served chart store, CHART_STORE_ROOT/<price data version>)")
+
+    def handle(self, *args, **options):
+        price_store = get_price_store()
+        frame = price_store.frame
+
+        as_of_dates = []
+        for value in options['as_of'] or [None]:
+            try:
+                requested = pd.Timestamp(value) if value else pd.Timestamp.today()
+            except ValueError:
+                raise CommandError(f"Invalid as-of date: {value}")
+            as_of = price_store.resolve_date(requested, side='before')
+            if as_of is None:
+                raise CommandError(f"No price data on or before {value}")
+            if as_of not in as_of_dates:
+                as_of_dates.append(as_of)
+
+        output_dir = options['output'] or os.path.join(CHART_STORE_ROOT, price_store.version)
+        tasks = self._tasks(output_dir, options['funds'], options['periods'], as_of_dates)
+        workers = max(1, min(options['workers'], len(tasks)))
+
+        self.stdout.write(f"Rendering {len(tasks)} charts with {workers} worker(s) into {output_dir} "
+                          f"(price data {price_store.version}, {price_store.source})")
+        started = time.perf_counter()
+
+        if workers == 1:
+            chart_batch.init_local(frame)
+            for task in tasks:
+                self._report(*chart_batch.render_chart(*task))
+        else:
+            shm, init_args = chart_batch.share_prices(frame)
+            try:
+                with ProcessPoolExecutor(max_workers=workers, initializer=chart_batch.init_worker, initargs=init_args) as pool:
+                    futures = [pool.submit(chart_batch.render_chart, *task) for task in tasks]
+                    for future in as_completed(futures):
+                        self._report(*future.result())
+            finally:
+                shm.close()
+                shm.unlink()
+
+        if not options['output']:
+            # Same as an on-demand build: the files of older price data go
+            for task in tasks:
+                remove_older_versions(task[0])
+
+        self.stdout.write(self.style.SUCCESS(f"{len(tasks)} charts in {time.perf_counter() - started:.2f}s"))
+
+    def _tasks(self, output_dir, funds, periods, as_of_dates):
+        """(path, kind, fund_key, period, as_of) of every chart to render, file names as chart_builder stores them."""
+        charts = []
+        for as_of in as_of_dates:
+            for fund_key in funds or DEFAULT_FUNDS:
+                if fund_key == 'ALL':
+                    for period in periods or DEFAULT_PERIODS:
+                        charts.append(('line', 'ALL', period, as_of))
+                        charts.append(('bar', 'ALL', period, as_of))
+                else:
+                    for period in periods or DEFAULT_SINGLE_FUND_PERIODS:
+                        charts.append(('line', fund_key, period, as_of))
+        return [
+            (os.path.join(output_dir, chart_file_name(kind, fund_key, period, as_of.strftime('%Y-%m-%d'))),
+             kind, fund_key, period, as_of.to_pydatetime())
+            for kind, fund_key, period, as_of in charts
+        ]
+
+    def _report(self, file_name, seconds):
+        self.stdout.write(f"  {seconds:7.3f}s  {file_name}")
@@ -0,0 +1,58 @@
+# periods.py - Return periods used by the fund charts ("Past_3_months", "Since_2020", ...)
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+# Period choice -> display label, in display order
+PERIOD_CHOICES = {
+    'Past_3_months': 'Past 3 months',
+    'Past_12_months': 'Past 12 months',
+    'Past_36_months': 'Past 36 months',
+    'Past_60_months': 'Past 60 months',
+    'Past_since_2016': 'Since 2016',
+    'Since_2020': 'Since 2020',
+    'Since_2023': 'Since 2023',
+    'Past_since_this_year': 'Since this year',
+}
+
+# Periods of a fixed number of days before the as-of date
+PERIOD_DAYS = {
+    'Past_3_months': 91,
+    'Past_12_months': 365,
+    'Past_36_months': 1095,
+    'Past_60_months': 1826,
+}
+
+# Periods starting on a fixed date
+PERIOD_FIXED_STARTS = {
+    'Past_since_2016': '2015-12-31',
+    'Since_2020': '2019-12-31',
+    'Since_2023': '2022-12-31',
+}
+
+
+def period_start_date(current_date, choice):
+    """Start date of a period ending on current_date (same rules as the chart scripts)."""
+    if choice in PERIOD_DAYS:
+        return current_date - timedelta(days=PERIOD_DAYS[choice])
+    elif choice in PERIOD_FIXED_STARTS:
+        return datetime.strptime(PERIOD_FIXED_STARTS[choice], '%Y-%m-%d')
+    elif choice == "Past_since_this_year":
+        return datetime(current_date.year - 1, 12, 31)
+    else:
+        raise ValueError("Invalid choice for start_date")
+
+
+def period_start_days(as_of_days, choice):
+    """Vectorised period_start_date() for a datetime64[D] array of as-of dates."""
+    as_of_days = np.asarray(as_of_days, dtype='datetime64[D]')
+    if choice in PERIOD_DAYS:
+        return as_of_days - np.timedelta64(PERIOD_DAYS[choice], 'D')
+    elif choice in PERIOD_FIXED_STARTS:
+        return np.full(as_of_days.shape, np.datetime64(PERIOD_FIXED_STARTS[choice], 'D'))
+    elif choice == "Past_since_this_year":
+        # 31 Dec of the previous year
+        return as_of_days.astype('datetime64[Y]').astype('datetime64[D]') - np.timedelta64(1, 'D')
+    else:
+        raise ValueError("Invalid choice for start_date")
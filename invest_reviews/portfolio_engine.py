@@ -0,0 +1,38 @@
+# portfolio_engine.py - Vectorized portfolio valuation for the portfolio charts
+
+import numpy as np
+
+
+def portfolio_time_series(df, start_date, current_date, invested_amount, weights):
+    """Value the portfolio and every fund holding for each date from start_date to current_date.
+
+    The price slice is normalised by its first row (growth since start_date) and
+    multiplied by the amount put into each fund, so there is no per-date loop.
+    start_date must be a date in df.index.
+
+    Returns (dates, portfolio_values, fund_values):
+      dates            - DatetimeIndex of the slice
+      portfolio_values - numpy array, total portfolio value per date
+      fund_values      - {fund_col: numpy array} for funds with weight > 0
+    """
+    fund_cols = list(weights.keys())
+    data = df.loc[start_date:current_date, fund_cols]
+    dates = data.index
+    prices = data.to_numpy(dtype='float64')
+
+    # Growth since start date; a zero start price means no growth (same as before)
+    start_prices = prices[0]
+    has_start = start_prices != 0
+    growth = np.ones_like(prices)
+    growth[:, has_start] = prices[:, has_start] / start_prices[has_start]
+
+    fund_amounts = invested_amount * np.array([weights[col] for col in fund_cols], dtype='float64')
+
+    portfolio_values = invested_amount + (growth - 1.0) @ fund_amounts
+
+    fund_values = {}
+    for i, col in enumerate(fund_cols):
+        if weights[col] > 0:
+            fund_values[col] = growth[:, i] * fund_amounts[i]
+
+    return dates, portfolio_values, fund_values
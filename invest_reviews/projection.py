@@ -0,0 +1,87 @@
+# projection.py - Monte Carlo projection of a portfolio's future value
+#
+# Paths follow the fund price model of investment_datas.fund_generator (the
+# model the fund prices were generated with). Funds without a model are
+# calibrated from their own past daily log returns. Only the chart's sample
+# dates are simulated, so memory is paths x points x funds, drawn in chunks.
+
+import numpy as np
+import pandas as pd
+
+from investment_datas.fund_generator import FUND_CONFIGS, coarse_log_params, daily_log_params, simulate_portfolio_growth
+from investment_datas.price_store import get_price_store, to_day
+from .chart_cache import ChartCache
+
+PROJECTION_PATHS = 5000
+PROJECTION_SEED = 2026
+PROJECTION_PERCENTILES = (5, 25, 50, 75, 95)
+DEFAULT_PROJECTION_YEARS = 10
+
+# Sample dates per projection (the chart resolution)
+PROJECTION_MAX_POINTS = 260
+
+# Past days used to calibrate funds without a model
+CALIBRATION_DAYS = 1095
+
+projection_cache = ChartCache(max_size=64)
+
+
+def _calibrated_params(price_store, fund_name, as_of, n_steps):
+    """(mu, sigma) columns from the fund's daily log returns over CALIBRATION_DAYS before as_of."""
+    i_end = price_store.resolve_date_index(as_of, side='before')
+    prices = price_store.values[max(0, i_end - CALIBRATION_DAYS):i_end + 1, price_store.fund_index[fund_name]] if i_end is not None else []
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_returns = np.diff(np.log(prices))
+    log_returns = log_returns[np.isfinite(log_returns)]
+    mu = log_returns.mean() if len(log_returns) > 1 else 0.0
+    sigma = log_returns.std(ddof=1) if len(log_returns) > 1 else 0.0
+    return np.full(n_steps, mu), np.full(n_steps, sigma)
+
+
+def _compute_projection(price_store, holdings, as_of, years, n_paths, seed):
+    fund_names = list(holdings)
+    start_value = sum(holdings.values())
+    weights = np.array([holdings[name] / start_value for name in fund_names])
+
+    start_day = to_day(as_of)
+    end_day = to_day(pd.Timestamp(as_of) + pd.DateOffset(years=years))
+    days = np.arange(start_day, end_day + np.timedelta64(1, 'D'))
+
+    mu = np.empty((len(days) - 1, len(fund_names)))
+    sigma = np.empty_like(mu)
+    modelled = [f for f, name in enumerate(fund_names) if name in FUND_CONFIGS]
+    if modelled:
+        mu[:, modelled], sigma[:, modelled] = daily_log_params([fund_names[f] for f in modelled], days)
+    for f, name in enumerate(fund_names):
+        if name not in FUND_CONFIGS:
+            mu[:, f], sigma[:, f] = _calibrated_params(price_store, name, as_of, len(days) - 1)
+
+    sample_rows = np.unique(np.linspace(0, len(days) - 1, min(len(days), PROJECTION_MAX_POINTS)).round().astype('int64'))
+    step_mu, step_sigma = coarse_log_params(mu, sigma, sample_rows)
+
+    growth = simulate_portfolio_growth(weights, step_mu, step_sigma, n_paths, seed)
+    bands = np.percentile(growth, PROJECTION_PERCENTILES, axis=0) * start_value
+
+    return {
+        'dates': days[sample_rows],
+        'start_value': start_value,
+        'bands': {p: band for p, band in zip(PROJECTION_PERCENTILES, bands)},
+    }
+
+
+def portfolio_projection(holdings, as_of, years=DEFAULT_PROJECTION_YEARS, n_paths=PROJECTION_PATHS, seed=PROJECTION_SEED):
+    """Percentile bands of the value of holdings ({fund_col: value}) held from as_of for years.
+
+    Returns {'dates', 'start_value', 'bands': {percentile: values}} with one value per
+    date, or None if there is nothing held. Cached per inputs and price data version;
+    the same inputs and seed always give the same bands.
+    """
+    price_store = get_price_store()
+    holdings = {name: float(value) for name, value in holdings.items() if value > 0 and price_store.has_fund(name)}
+    if not holdings:
+        return None
+    key = (
+        tuple((name, round(value, 2)) for name, value in sorted(holdings.items())),
+        str(to_day(as_of)), years, n_paths, seed, price_store.version,
+    )
+    return projection_cache.get_or_build(key, lambda: _compute_projection(price_store, holdings, as_of, years, n_paths, seed))
@@ -0,0 +1,237 @@
+# returns_table.py - Precomputed period returns of every fund for every as-of date
+#
+# For each period of PERIOD_CHOICES and each date of the price store (as-of
+# date) the table holds, per fund:
+#   return_pct        - % change from the period's first trading day (same as calculate_pct_change)
+#   cagr_pct          - compound annual growth rate in %
+#   max_drawdown_pct  - largest fall from a previous peak inside the period, in % (<= 0)
+# Built in one vectorised pass per period, extended in place when new prices
+# are appended to the price store. Requests use get_ready_returns_table(),
+# which never builds in the request: the table is built on a background
+# thread and period_returns_at() answers directly until it is ready.
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from investment_datas.price_store import get_price_store, to_day
+from .periods import PERIOD_CHOICES, period_start_days
+
+# Cells (rows x window length x funds) gathered at once for sliding window drawdowns
+DRAWDOWN_CHUNK_CELLS = 2000000
+
+
+def _max_drawdowns(values, starts, ends):
+    """Max drawdown (fraction, <= 0) of values[start..end] for each (start, end), per fund column."""
+    out = np.full((len(ends), values.shape[1]), np.nan)
+    if len(ends) == 0:
+        return out
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Runs of ends sharing a start (since 2016, since this year): one running pass per run
+        bounds = np.concatenate(([0], np.flatnonzero(np.diff(starts)) + 1, [len(starts)]))
+        if len(bounds) - 1 <= len(starts) // 4:
+            for a, b in zip(bounds[:-1], bounds[1:]):
+                s = starts[a]
+                seg = values[s:ends[b - 1] + 1]
+                drawdown = np.fmin.accumulate(seg / np.fmax.accumulate(seg, axis=0) - 1, axis=0)
+                out[a:b] = drawdown[ends[a:b] - s]
+            return out
+
+        # Sliding windows: gather windows of a chunk of ends into one 3D array.
+        # Positions past a window's end repeat its end price, which does not change its drawdown.
+        lengths = ends - starts + 1
+        window = int(lengths.max())
+        rows = max(1, DRAWDOWN_CHUNK_CELLS // (window * values.shape[1]))
+        offsets = np.arange(window)
+        for a in range(0, len(ends), rows):
+            s = starts[a:a + rows, None]
+            e = ends[a:a + rows, None]
+            seg = values[np.minimum(s + offsets, e)]
+            out[a:a + rows] = np.fmin.reduce(seg / np.fmax.accumulate(seg, axis=1) - 1, axis=1)
+    return out
+
+
+def _compute(dates, values, ends):
+    """Return (start_index, return_pct, cagr_pct, max_drawdown_pct) for the as-of rows ends."""
+    periods = len(PERIOD_CHOICES)
+    shape = (periods, len(ends), values.shape[1])
+    start_index = np.full((periods, len(ends)), -1, dtype='int64')
+    return_pct = np.full(shape, np.nan)
+    cagr_pct = np.full(shape, np.nan)
+    max_drawdown_pct = np.full(shape, np.nan)
+
+    day_numbers = dates.astype('int64')
+
+    for p, choice in enumerate(PERIOD_CHOICES):
+        # First trading day on or after the period start, as df.loc[start:as_of] does
+        starts = np.searchsorted(dates, period_start_days(dates[ends], choice), side='left')
+        valid = starts <= ends
+        s, e = starts[valid], ends[valid]
+        start_index[p, valid] = s
+
+        start_prices = values[s]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = values[e] / start_prices
+            return_pct[p, valid] = np.where(start_prices != 0, (ratio - 1) * 100, 0)
+
+            years = ((day_numbers[e] - day_numbers[s]) / 365.25)[:, None]
+            cagr = np.power(ratio, 1 / np.where(years > 0, years, np.nan)) - 1
+            cagr_pct[p, valid] = np.where((years > 0) & (ratio > 0), cagr * 100, np.nan)
+
+        max_drawdown_pct[p, valid] = _max_drawdowns(values, s, e) * 100
+
+    return start_index, return_pct, cagr_pct, max_drawdown_pct
+
+
+class ReturnsTable:
+    """Period returns of a FundPriceStore; row i is the as-of date store.dates[i]."""
+
+    def __init__(self, store, start_index, return_pct, cagr_pct, max_drawdown_pct):
+        self.version = store.version
+        self.dates = store.dates
+        self.values = store.values
+        self.fund_names = store.fund_names
+        self.fund_index = store.fund_index
+        self.period_index = {choice: p for p, choice in enumerate(PERIOD_CHOICES)}
+        self.start_index = start_index
+        self.return_pct = return_pct
+        self.cagr_pct = cagr_pct
+        self.max_drawdown_pct = max_drawdown_pct
+
+    @classmethod
+    def build(cls, store):
+        return cls(store, *_compute(store.dates, store.values, np.arange(len(store.dates))))
+
+    def is_prefix_of(self, store):
+        """True if store only appended dates to the prices this table was built from."""
+        n = len(self.dates)
+        return (
+            store.fund_names == self.fund_names
+            and len(store.dates) >= n
+            and np.array_equal(store.dates[:n], self.dates)
+            and np.array_equal(store.values[:n], self.values, equal_nan=True)
+        )
+
+    def extended(self, store):
+        """Table for store computing only the appended as-of dates (store must pass is_prefix_of)."""
+        new_rows = _compute(store.dates, store.values, np.arange(len(self.dates), len(store.dates)))
+        old_rows = (self.start_index, self.return_pct, self.cagr_pct, self.max_drawdown_pct)
+        return ReturnsTable(store, *(np.concatenate((old, new), axis=1) for old, new in zip(old_rows, new_rows)))
+
+    def row(self, as_of):
+        """Index of the last as-of date on or before as_of, or None."""
+        i = np.searchsorted(self.dates, to_day(as_of), side='right') - 1
+        return int(i) if i >= 0 else None
+
+    def lookup(self, fund_name, period, i):
+        """Dict of start / end date, return_pct, cagr_pct, max_drawdown_pct of fund_name over period at row i, or None."""
+        p = self.period_index[period]
+        s = self.start_index[p, i]
+        if s < 0 or fund_name not in self.fund_index:
+            return None
+        f = self.fund_index[fund_name]
+        return {
+            'start': str(self.dates[s]),
+            'end': str(self.dates[i]),
+            'return_pct': _to_float(self.return_pct[p, i, f]),
+            'cagr_pct': _to_float(self.cagr_pct[p, i, f]),
+            'max_drawdown_pct': _to_float(self.max_drawdown_pct[p, i, f]),
+        }
+
+    def period_returns(self, period, i, fund_names):
+        """{fund_name: return_pct} over period at row i, None if the period has no data."""
+        p = self.period_index[period]
+        if self.start_index[p, i] < 0:
+            return None
+        return {name: _to_float(self.return_pct[p, i, self.fund_index[name]]) for name in fund_names}
+
+    def period_start(self, period, i):
+        s = self.start_index[self.period_index[period], i]
+        return None if s < 0 else str(self.dates[s])
+
+
+def _to_float(value):
+    value = float(value)
+    return None if value != value else value
+
+
+_lock = threading.Lock()
+_table = None
+
+# One background build at a time
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='returns_table')
+_pending = False
+_pending_lock = threading.Lock()
+
+
+def get_returns_table():
+    """Returns table of the current price store, built on first use and extended when prices are appended."""
+    global _table
+    store = get_price_store()
+    table = _table
+    if table is not None and table.version == store.version:
+        return table
+
+    with _lock:
+        if _table is None or _table.version != store.version:
+            if _table is not None and _table.is_prefix_of(store):
+                _table = _table.extended(store)
+            else:
+                _table = ReturnsTable.build(store)
+        return _table
+
+
+def _build_in_background():
+    global _pending
+    with _pending_lock:
+        if _pending:
+            return
+        _pending = True
+
+    def run():
+        global _pending
+        try:
+            get_returns_table()
+        finally:
+            with _pending_lock:
+                _pending = False
+
+    _executor.submit(run)
+
+
+def get_ready_returns_table():
+    """Returns table of the current price store, or None while it is built or extended in the background."""
+    table = _table
+    if table is not None and table.version == get_price_store().version:
+        return table
+    _build_in_background()
+    return None
+
+
+def period_returns_at(i, periods, fund_names):
+    """[(period, start date, {fund_name: return_pct})] at as-of row i of the current price store.
+
+    Read from the table when it is ready, otherwise computed for this row only.
+    Periods without data are left out.
+    """
+    table = get_ready_returns_table()
+    if table is not None:
+        return [
+            (period, table.period_start(period, i), table.period_returns(period, i, fund_names))
+            for period in periods if table.period_start(period, i) is not None
+        ]
+
+    store = get_price_store()
+    cols = [store.fund_index[name] for name in fund_names]
+    results = []
+    for period in periods:
+        s = int(np.searchsorted(store.dates, period_start_days(store.dates[i:i + 1], period)[0], side='left'))
+        if s > i:
+            continue
+        start_prices = store.values[s, cols]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return_pct = np.where(start_prices != 0, (store.values[i, cols] / start_prices - 1) * 100, 0)
+        results.append((period, str(store.dates[s]), {name: _to_float(value) for name, value in zip(fund_names, return_pct)}))
+    return results
@@ -0,0 +1,133 @@
+// fund_charts.js - draws line / pie / bar charts from the invest_reviews chart data API
+//
+// Usage:
+//   <div data-chart-type="line" data-chart-url="{% url 'invest_reviews:api_fund_series' %}?funds=A,B"
+//        data-chart-title="..." data-max-points="800"></div>
+//   data-chart-type: line (fund / portfolio series), pie (portfolio holdings), bar (period returns)
+// Needs Plotly loaded first (CDN).
+
+(function () {
+  const DAY_MS = 86400000;
+  const requests = {};
+
+  // One request per URL, shared by all charts using it (e.g. portfolio line + pie)
+  function fetchData(url) {
+    if (!requests[url]) {
+      requests[url] = fetch(url, { credentials: "same-origin" }).then((response) =>
+        response.json().then((data) => {
+          if (!response.ok) {
+            throw new Error(typeof data.error === "string" ? data.error : JSON.stringify(data.error));
+          }
+          return data;
+        })
+      );
+    }
+    return requests[url];
+  }
+
+  function decodeBase64(b64) {
+    const binary = atob(b64);
+    const bytes = new Uint8Array(binary.length);
+    for (let i = 0; i < binary.length; i++) {
+      bytes[i] = binary.charCodeAt(i);
+    }
+    return bytes.buffer;
+  }
+
+  function decodeDates(data) {
+    const offsets = new Int32Array(decodeBase64(data.days));
+    return Array.from(offsets, (d) => new Date((data.base_day + d) * DAY_MS).toISOString().slice(0, 10));
+  }
+
+  function decodeValues(b64) {
+    return Array.from(new Float32Array(decodeBase64(b64)), (v) => (Number.isNaN(v) ? null : v));
+  }
+
+  function formatPct(value) {
+    return value === null ? "n/a" : value.toFixed(2) + "%";
+  }
+
+  function drawLine(el, data) {
+    const dates = decodeDates(data);
+    const traces = data.series.map((s, i) => ({
+      x: dates,
+      y: decodeValues(s.values),
+      mode: "lines",
+      name: s.label,
+      // portfolio: funds are dashed behind the portfolio line
+      line: data.current_value !== undefined && i > 0 ? { dash: "dash" } : { width: data.current_value !== undefined ? 3 : 2 },
+    }));
+
+    let text;
+    if (data.current_value !== undefined) {
+      text = `Current Value: $${data.current_value.toLocaleString(undefined, { minimumFractionDigits: 2, maximumFractionDigits: 2 })}<br>` +
+        `Return: ${data.return_pct >= 0 ? "+" : ""}${data.return_pct.toFixed(2)}%`;
+    } else {
+      text = data.series.map((s) => `${s.label}: ${formatPct(data.pct_changes[s.name])}`).join("<br>");
+    }
+
+    Plotly.newPlot(el, traces, {
+      title: el.dataset.chartTitle || `Value Change from ${data.start} to ${data.end}`,
+      xaxis: { title: "Date", showline: true, linecolor: "black", gridcolor: "lightgray" },
+      yaxis: { title: "Value", rangemode: "tozero" },
+      legend: { x: 0, y: 1.1, orientation: "h" },
+      margin: { l: 80, r: 200 },
+      annotations: [{ x: 1.05, y: 0.5, xref: "paper", yref: "paper", xanchor: "left", text: text, showarrow: false, align: "left" }],
+    }, { responsive: true });
+  }
+
+  function drawPie(el, data) {
+    const holdings = data.holdings || [];
+    Plotly.newPlot(el, [{
+      type: "pie",
+      labels: holdings.map((h) => h.label),
+      values: holdings.map((h) => h.value),
+      customdata: holdings.map((h) => `${h.long_name}<br>$${h.value.toLocaleString(undefined, { minimumFractionDigits: 2, maximumFractionDigits: 2 })}<br>${h.pct.toFixed(2)}%`),
+      textinfo: "label+percent",
+      textposition: "inside",
+      hovertemplate: "%{customdata}<extra></extra>",
+    }], {
+      title: el.dataset.chartTitle || "Current Portfolio Holdings Value",
+    }, { responsive: true });
+  }
+
+  function drawBar(el, data) {
+    const traces = data.periods.map((p) => ({
+      type: "bar",
+      name: p.label,
+      x: data.funds.map((f) => f.label),
+      y: data.funds.map((f) => p.returns[f.name]),
+    }));
+    Plotly.newPlot(el, traces, {
+      title: el.dataset.chartTitle || `Percentage Change to ${data.end}`,
+      barmode: "group",
+      yaxis: { title: "Percentage Change", ticksuffix: "%" },
+    }, { responsive: true });
+  }
+
+  const drawers = { line: drawLine, pie: drawPie, bar: drawBar };
+
+  function chartUrl(el) {
+    const url = new URL(el.dataset.chartUrl, window.location.href);
+    if (el.dataset.maxPoints) {
+      url.searchParams.set("max_points", el.dataset.maxPoints);
+    }
+    return url.toString();
+  }
+
+  function draw(el) {
+    const drawer = drawers[el.dataset.chartType];
+    if (!drawer) {
+      return;
+    }
+    fetchData(chartUrl(el))
+      .then((data) => drawer(el, data))
+      .catch((error) => {
+        el.textContent = "Chart not available: " + error.message;
+      });
+  }
+
+  document.addEventListener("DOMContentLoaded", () => {
+    document.querySelectorAll("[data-chart-type][data-chart-url]").forEach(draw);
+  });
+})();
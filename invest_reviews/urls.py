@@ -9,6 +9,10 @@ from .views import (
     this_year_performance_view,  # placeholder
     more_to_see_view,  # placeholder
     fund_individual_this_year_view,
+    fund_series_api,
+    portfolio_series_api,
+    period_returns_api,
+    fund_chart_view,
 )
 
 app_name = 'invest_reviews'  # MUST have this
@@ -31,5 +35,13 @@ urlpatterns = [
     
     path('more-to-see/', more_to_see_view, name='more_to_see'),
     
+    # Fund charts, built on first request and cached on disk
+    path('charts/<str:version>/<str:kind>/<str:fund_key>/<str:period>/<str:as_of>/', fund_chart_view, name='fund_chart'),
+    
+    # Chart data (JSON), drawn by static/js/fund_charts.js
+    path('api/fund-series/', fund_series_api, name='api_fund_series'),
+    path('api/portfolio-series/', portfolio_series_api, name='api_portfolio_series'),
+    path('api/period-returns/', period_returns_api, name='api_period_returns'),
+    
 ]
 
@@ -2,82 +2,49 @@ from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django import forms
 from datetime import datetime, timedelta
+from urllib.parse import urlencode
 import pandas as pd
 import plotly.graph_objects as go
 import plotly.express as px
-import os
-from django.conf import settings
 from django.urls import reverse
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404
+from django.utils.cache import patch_cache_control
+from django.views.decorators.clickjacking import xframe_options_sameorigin
+from django.contrib import messages
 
 # Import fund briefs
 from .fundbriefing import fund_briefs
 
-# Fund mappings
-short_names = {
-    'Fund_A': 'Fund A',
-    'Fund_B': 'Fund B',
-    'Fund_C': 'Fund C',
-    'Fund_D': 'Fund D'
-}
-
-long_names = {
-    'Fund_A': 'Conviction Growth Fund (A)',
-    'Fund_B': 'Diversified Assets Fund (B)',
-    'Fund_C': 'Balanced Horizon Fund (C)',
-    'Fund_D': 'Money Market Fund (D)'
-}
-
-fund_map = {'A': 'Fund_A', 'B': 'Fund_B', 'C': 'Fund_C', 'D': 'Fund_D'}
-
-# Lazy load function for fund data
-def get_fund_data():
-    csv_path = os.path.join(settings.BASE_DIR, 'default_data', 'funds_daily_2015_to_2036.csv')
-    df = pd.read_csv(csv_path)
-    df['Date'] = pd.to_datetime(df['Date'])
-    df = df.set_index('Date').sort_index()
-    return df
+# Vectorized portfolio valuation
+from .portfolio_engine import portfolio_time_series
 
-# Helper functions
-def calculate_pct_change(start_val, end_val):
-    return ((end_val - start_val) / start_val) * 100 if start_val != 0 else 0
-
-def create_l_chart(data, fund_cols, title, start_date, current_date, is_combined=False):
-    fig = go.Figure()
-    pct_text = ''
-    if is_combined:
-        for col in fund_cols:
-            short_name = short_names.get(col, col)
-            fig.add_trace(go.Scatter(x=data.index, y=data[col], mode='lines', name=short_name))
-        pct_text = '<br>'.join([f"{short_names.get(col, col)}: {calculate_pct_change(data[col].iloc[0], data[col].iloc[-1]):.2f}%" for col in fund_cols])
-        legend_text = "<b>Fund Mapping:</b><br>" + "<br>".join([f"{long_names[col]}" for col in fund_cols])
-        fig.update_layout(title=title, xaxis_title='Year', yaxis_title='Value', yaxis=dict(range=[0, None]), legend=dict(x=0, y=1.1, orientation='h'))
-        fig.add_annotation(x=0.02, y=0.95, text=legend_text, showarrow=False, xref='paper', yref='paper', align='left', bgcolor='rgba(255,255,255,0.8)', bordercolor='black', borderwidth=1, font=dict(size=11))
-    else:
-        col = fund_cols[0]
-        long_name = long_names.get(col, col)
-        fig.add_trace(go.Scatter(x=data.index, y=data[col], mode='lines', name=long_name))
-        pct_change = calculate_pct_change(data[col].iloc[0], data[col].iloc[-1])
-        pct_text = f"Percentage Change: {pct_change:.2f}%"
-        if col == 'Fund_D':
-            min_val = data[col].min()
-            max_val = data[col].max()
-            buffer = (max_val - min_val) * 0.05
-            y_min = max(80, min_val * 0.98)
-            y_max = max_val + buffer
-            fig.update_layout(title=title, xaxis_title='Year', yaxis_title='Value', yaxis=dict(range=[y_min, y_max]))
-        else:
-            fig.update_layout(title=title, xaxis_title='Year', yaxis_title='Value', yaxis=dict(range=[0, None]))
-    days_diff = (current_date - start_date).days
-    if days_diff > 365:
-        fig.update_xaxes(dtick='M12', tickformat='%Y', showline=True, linewidth=1.5, linecolor='black', gridcolor='lightgray')
-    else:
-        fig.update_xaxes(dtick='M3', tickformat='%Y %b', showline=True, linewidth=1.5, linecolor='black', gridcolor='lightgray')
-    fig.update_xaxes(zeroline=False)
-    fig.add_annotation(x=1.05, y=0.5, text=pct_text, showarrow=False, xref='paper', yref='paper', align='left', font=dict(size=12))
-    fig.update_layout(width=900, height=600, margin=dict(l=220, r=220))
-    return fig
+# Rendered portfolio charts, reused for repeated requests
+from .chart_cache import portfolio_chart_cache, portfolio_chart_key
+
+# LTTB downsampling of long daily series before plotting
+from .downsample import downsample_series
+
+# Compact chart series for the client side renderer (static/js/fund_charts.js)
+from .chart_data import series_payload
+from .periods import PERIOD_CHOICES, period_start_date
+from .returns_table import period_returns_at
+
+# Fund names and chart figures (shared with the chart build service)
+from .charts import short_names, long_names, fund_map, calculate_pct_change
+
+# Chart files built on first request, see chart_builder.py
+from .chart_builder import chart_url, open_chart_file, is_valid_chart, resolve_as_of
+
+# Volatility, drawdown, Sharpe / Sortino and correlations, cached per as-of date
+from .analytics import fund_analytics_summary
+
+# Monte Carlo projection of the portfolio value, cached per inputs
+from .projection import portfolio_projection, DEFAULT_PROJECTION_YEARS, PROJECTION_PATHS
+
+# Shared fund data, loaded once per process (see investment_datas.price_store)
+from investment_datas.price_store import get_price_store
 
+# Helper functions
 def calculate_portfolio_value(df, start_date, current_date, invested_amount, weights):
     start_row = df.loc[start_date]
     current_row = df.loc[current_date]
@@ -95,6 +62,88 @@ def calculate_portfolio_value(df, start_date, current_date, invested_amount, wei
     current_alloc_pct = {fund: (val / port_current * 100) if port_current != 0 else 0 for fund, val in current_holdings.items()}
     return port_start, port_current, gain, return_pct, current_holdings, current_alloc_pct
 
+def build_portfolio_charts(df, start_date, current_date, invested_amount, weights):
+    """Render the portfolio value chart and the holdings pie as HTML fragments."""
+    start_date_str = start_date.strftime('%Y-%m-%d')
+    current_date_str = current_date.strftime('%Y-%m-%d')
+    
+    active_funds = [f for f, w in weights.items() if w > 0]
+    port_start, port_current, gain, return_pct, current_holdings, current_alloc_pct = calculate_portfolio_value(
+        df, start_date, current_date, invested_amount, weights
+    )
+    
+    dates, portfolio_values, fund_values = portfolio_time_series(
+        df, start_date, current_date, invested_amount, weights
+    )
+    
+    fig_port = go.Figure()
+    # Traces are downsampled, the value / return annotation uses the full series
+    x, y = downsample_series(dates, portfolio_values)
+    fig_port.add_trace(go.Scatter(x=x, y=y, name="Your Portfolio", line=dict(width=3, color='royalblue')))
+    
+    fund_colors = {'Fund_A': '#1f77b4', 'Fund_B': '#2ca02c', 'Fund_C': '#ff7f0e', 'Fund_D': '#9467bd'}
+    for fund_col in active_funds:
+        x, y = downsample_series(dates, fund_values[fund_col])
+        fig_port.add_trace(go.Scatter(x=x, y=y, name=short_names[fund_col], line=dict(dash='dash', color=fund_colors[fund_col]), visible=False))
+    
+    min_port = portfolio_values.min()
+    y_min = min(0, min_port * 0.95) if min_port < invested_amount else 0
+    fig_port.update_layout(
+        title=f"Your Portfolio Value Change from {start_date_str} to {current_date_str}",
+        xaxis_title="Date",
+        yaxis_title="Portfolio Value (USD)",
+        yaxis=dict(range=[y_min, portfolio_values.max() * 1.05]),
+        legend=dict(x=0, y=1.1, orientation='h'),
+        margin=dict(l=250, r=200, t=120),
+        updatemenus=[dict(type="buttons", direction="left", x=0.1, y=1.25, pad=dict(t=50), showactive=True,
+                          buttons=[dict(label="Hide Funds", method="update", args=[{"visible": [True] + [False] * len(active_funds)}]),
+                                   dict(label="Show Funds", method="update", args=[{"visible": [True] * (1 + len(active_funds))}])])]
+    )
+    fig_port.add_annotation(x=1.05, y=0.5, text=f"Current Value: ${port_current:,.2f}<br>Return: {return_pct:+.2f}%",
+                            showarrow=False, xref='paper', yref='paper', align='left', font=dict(size=12))
+    
+    port_div = fig_port.to_html(full_html=False, include_plotlyjs='cdn')
+    
+    pie_labels = [short_names[fund_col] for fund_col in fund_map.values() if weights[fund_col] > 0]
+    pie_values = [current_holdings[fund_col] for fund_col in fund_map.values() if weights[fund_col] > 0]
+    pie_hover = [f"{long_names[fund_col]}<br>${current_holdings[fund_col]:,.2f}<br>{current_alloc_pct[fund_col]:.2f}%" for fund_col in fund_map.values() if weights[fund_col] > 0]
+    
+    fig_pie = px.pie(names=pie_labels, values=pie_values, title="Current Portfolio Holdings Value")
+    fig_pie.update_traces(textinfo='label+percent', textposition='inside', hovertemplate="%{customdata}<extra></extra>", customdata=pie_hover)
+    
+    pie_div = fig_pie.to_html(full_html=False, include_plotlyjs='cdn')
+    
+    return port_div, pie_div
+
+def build_projection_chart(df, start_date, current_date, invested_amount, weights, years):
+    """Render the percentile bands of the projected value of the current holdings, or None."""
+    current_holdings = calculate_portfolio_value(df, start_date, current_date, invested_amount, weights)[4]
+    projection = portfolio_projection(current_holdings, current_date, years)
+    if projection is None:
+        return None
+    
+    x = pd.to_datetime(projection['dates'])
+    bands = projection['bands']
+    fig_proj = go.Figure()
+    # Outer band (5th-95th), inner band (25th-75th), each filled to its lower edge
+    for low, high, color in ((5, 95, 'rgba(65, 105, 225, 0.15)'), (25, 75, 'rgba(65, 105, 225, 0.3)')):
+        fig_proj.add_trace(go.Scatter(x=x, y=bands[low], line=dict(width=0), showlegend=False, hoverinfo='skip'))
+        fig_proj.add_trace(go.Scatter(x=x, y=bands[high], fill='tonexty', fillcolor=color, line=dict(width=0),
+                                      name=f"{low}th - {high}th percentile", hoverinfo='skip'))
+    fig_proj.add_trace(go.Scatter(x=x, y=bands[50], name="Median", line=dict(width=3, color='royalblue')))
+    
+    fig_proj.update_layout(
+        title=f"Projected Portfolio Value, {years} years from {current_date.strftime('%Y-%m-%d')} ({PROJECTION_PATHS:,} simulated paths)",
+        xaxis_title="Date",
+        yaxis_title="Portfolio Value (USD)",
+        legend=dict(x=0, y=1.1, orientation='h'),
+        margin=dict(l=250, r=200, t=120),
+    )
+    fig_proj.add_annotation(x=1.05, y=0.5, xref='paper', yref='paper', align='left', showarrow=False, font=dict(size=12),
+                            text="<br>".join(f"{p}th: ${bands[p][-1]:,.2f}" for p in sorted(bands, reverse=True)))
+    
+    return fig_proj.to_html(full_html=False, include_plotlyjs='cdn')
+
 # Portfolio form
 class PortfolioForm(forms.Form):
     current_date = forms.DateField(initial=datetime(2026, 1, 28))
@@ -104,6 +153,7 @@ class PortfolioForm(forms.Form):
     pct_C = forms.IntegerField(initial=20, min_value=0, max_value=100)
     pct_D = forms.IntegerField(initial=20, min_value=0, max_value=100)
     start_date = forms.DateField(initial=datetime(2021, 11, 11))
+    projection_years = forms.IntegerField(initial=DEFAULT_PROJECTION_YEARS, min_value=1, max_value=30, required=False)
 
     def clean(self):
         cleaned_data = super().clean()
@@ -124,10 +174,8 @@ def get_back_url(request):
 
 @login_required
 def invest_reviews_view(request):
-    chart_folder = 'FundCharts_Store'
-    main_chart = f"{chart_folder}/Combined_All_Funds_Since_this_year_to_2025-12-31.html"
     context = {
-        'main_chart': main_chart,
+        'main_chart_url': chart_url('line', 'ALL', 'Past_since_this_year'),
         'fund_briefs': fund_briefs,
         'back_url': request.META.get('HTTP_REFERER','/'),
     }
@@ -137,7 +185,8 @@ def invest_reviews_view(request):
 
 @login_required
 def portfolio_view(request):
-    df = get_fund_data()
+    price_store = get_price_store()
+    df = price_store.frame
     
     if request.method == 'POST':
         form = PortfolioForm(request.POST)
@@ -153,94 +202,40 @@ def portfolio_view(request):
             requested_start_date = form.cleaned_data['start_date']
             start_date_dt = pd.to_datetime(requested_start_date)
             
-            # Debug prints
-            print("Index sample:", df.index[:5])
-            print("Requested start (converted):", start_date_dt)
-            print("In index (start)?", start_date_dt in df.index)
-            print("Requested current (converted):", current_date)
-            print("In index (current)?", current_date in df.index)
-            
+            # Nearest trading days, binary search on the price store dates
             # Start date handling
-            if start_date_dt not in df.index:
-                available_start = df.index[df.index >= start_date_dt]
-                if available_start.empty:
-                    messages.error(request, "No data available after requested start date.")
-                    return render(request, 'invest_reviews/portfolio.html', {'form': form})
-                start_date = available_start.min()
+            start_date = price_store.resolve_date(start_date_dt, side='after')
+            if start_date is None:
+                messages.error(request, "No data available after requested start date.")
+                return render(request, 'invest_reviews/portfolio.html', {'form': form})
+            if start_date != start_date_dt:
                 messages.warning(request, f"Using nearest start date: {start_date.date()}")
-            else:
-                start_date = start_date_dt
             
             # Current date handling
-            if current_date not in df.index:
-                available_end = df.index[df.index <= current_date]
-                if available_end.empty:
-                    messages.error(request, "No data available before requested current date.")
-                    return render(request, 'invest_reviews/portfolio.html', {'form': form})
-                current_date = available_end.max()
+            requested_current_date = current_date
+            current_date = price_store.resolve_date(requested_current_date, side='before')
+            if current_date is None:
+                messages.error(request, "No data available before requested current date.")
+                return render(request, 'invest_reviews/portfolio.html', {'form': form})
+            if current_date != requested_current_date:
                 messages.warning(request, f"Using nearest current date: {current_date.date()}")
-            else:
-                current_date = current_date
             
-            start_date_str = start_date.strftime('%Y-%m-%d')
-            current_date_str = current_date.strftime('%Y-%m-%d')
+            if start_date > current_date:
+                messages.error(request, "Start date must be before current date.")
+                return render(request, 'invest_reviews/portfolio.html', {'form': form})
             
-            active_funds = [f for f, w in weights.items() if w > 0]
-            port_start, port_current, gain, return_pct, current_holdings, current_alloc_pct = calculate_portfolio_value(
-                df, start_date, current_date, invested_amount, weights
+            key = portfolio_chart_key(start_date, current_date, invested_amount, weights, price_store.version)
+            port_div, pie_div = portfolio_chart_cache.get_or_build(
+                key, lambda: build_portfolio_charts(df, start_date, current_date, invested_amount, weights)
             )
             
-            dates = df.loc[start_date:current_date].index
-            portfolio_values = []
-            for dt in dates:
-                row = df.loc[dt]
-                port_val = invested_amount
-                for fund_col, weight in weights.items():
-                    growth = row[fund_col] / df.loc[start_date, fund_col] if df.loc[start_date, fund_col] != 0 else 1.0
-                    port_val += (invested_amount * weight) * (growth - 1)
-                portfolio_values.append(port_val)
-            
-            fig_port = go.Figure()
-            fig_port.add_trace(go.Scatter(x=dates, y=portfolio_values, name="Your Portfolio", line=dict(width=3, color='royalblue')))
-            
-            fund_colors = {'Fund_A': '#1f77b4', 'Fund_B': '#2ca02c', 'Fund_C': '#ff7f0e', 'Fund_D': '#9467bd'}
-            for fund_col in active_funds:
-                fund_values = []
-                for dt in dates:
-                    start_val = df.loc[start_date, fund_col]
-                    curr_val = df.loc[dt, fund_col]
-                    growth = curr_val / start_val if start_val != 0 else 1.0
-                    fund_values.append(invested_amount * weights[fund_col] * growth)
-                fig_port.add_trace(go.Scatter(x=dates, y=fund_values, name=short_names[fund_col], line=dict(dash='dash', color=fund_colors[fund_col]), visible=False))
-            
-            min_port = min(portfolio_values)
-            y_min = min(0, min_port * 0.95) if min_port < invested_amount else 0
-            fig_port.update_layout(
-                title=f"Your Portfolio Value Change from {start_date_str} to {current_date_str}",
-                xaxis_title="Date",
-                yaxis_title="Portfolio Value (USD)",
-                yaxis=dict(range=[y_min, max(portfolio_values) * 1.05]),
-                legend=dict(x=0, y=1.1, orientation='h'),
-                margin=dict(l=250, r=200, t=120),
-                updatemenus=[dict(type="buttons", direction="left", x=0.1, y=1.25, pad=dict(t=50), showactive=True,
-                                  buttons=[dict(label="Hide Funds", method="update", args=[{"visible": [True] + [False] * len(active_funds)}]),
-                                           dict(label="Show Funds", method="update", args=[{"visible": [True] * (1 + len(active_funds))}])])]
+            projection_years = form.cleaned_data.get('projection_years') or DEFAULT_PROJECTION_YEARS
+            proj_div = portfolio_chart_cache.get_or_build(
+                key + ('projection', projection_years),
+                lambda: build_projection_chart(df, start_date, current_date, invested_amount, weights, projection_years)
             )
-            fig_port.add_annotation(x=1.05, y=0.5, text=f"Current Value: ${port_current:,.2f}<br>Return: {return_pct:+.2f}%",
-                                    showarrow=False, xref='paper', yref='paper', align='left', font=dict(size=12))
-            
-            port_div = fig_port.to_html(full_html=False, include_plotlyjs='cdn')
-            
-            pie_labels = [short_names[fund_col] for fund_col in fund_map.values() if weights[fund_col] > 0]
-            pie_values = [current_holdings[fund_col] for fund_col in fund_map.values() if weights[fund_col] > 0]
-            pie_hover = [f"{long_names[fund_col]}<br>${current_holdings[fund_col]:,.2f}<br>{current_alloc_pct[fund_col]:.2f}%" for fund_col in fund_map.values() if weights[fund_col] > 0]
-            
-            fig_pie = px.pie(names=pie_labels, values=pie_values, title="Current Portfolio Holdings Value")
-            fig_pie.update_traces(textinfo='label+percent', textposition='inside', hovertemplate="%{customdata}<extra></extra>", customdata=pie_hover)
             
-            pie_div = fig_pie.to_html(full_html=False, include_plotlyjs='cdn')
-            
-            return render(request, 'invest_reviews/portfolio.html', {'form': form, 'port_div': port_div, 'pie_div': pie_div, 'back_url': request.META.get('HTTP_REFERER', reverse('invest_reviews:main')),})
+            return render(request, 'invest_reviews/portfolio.html', {'form': form, 'port_div': port_div, 'pie_div': pie_div, 'proj_div': proj_div, 'back_url': request.META.get('HTTP_REFERER', reverse('invest_reviews:main')),})
     else:
         form = PortfolioForm()
     
@@ -261,13 +256,27 @@ def fund_detail_view(request, fund_key):
         return redirect('invest_reviews:fund_descriptions')
     
     brief = fund_briefs[fund_key]
-    chart_file = f"{fund_key}_Since_2016_to_2025-12-31.html"  # correct filename
+    
+    # Chart drawn in the browser by js/fund_charts.js from the fund series API
+    series_url = None
+    series_title = None
+    as_of = resolve_as_of(get_price_store())
+    if fund_key in fund_map and as_of is not None:
+        start_date = period_start_date(as_of.to_pydatetime(), 'Past_since_2016')
+        series_url = reverse('invest_reviews:api_fund_series') + '?' + urlencode({
+            'funds': fund_key,
+            'start': start_date.strftime('%Y-%m-%d'),
+            'end': as_of.strftime('%Y-%m-%d'),
+        })
+        series_title = f"{short_names[fund_map[fund_key]]} {PERIOD_CHOICES['Past_since_2016']} to {as_of.strftime('%Y-%m-%d')}"
     
     context = {
         'fund_key': fund_key,
         'short': brief['short'],
         'long': brief['long'],
-        'chart_path': f"FundCharts_Store/{chart_file}",
+        'series_url': series_url,
+        'series_title': series_title,
+        'analytics': fund_analytics_summary(fund_map[fund_key], list(fund_map.values())) if fund_key in fund_map else None,
         'back_url': get_back_url(request),
     }
     return render(request, 'invest_reviews/fund_detail.html', context)
@@ -275,10 +284,8 @@ def fund_detail_view(request, fund_key):
 # -- Performance Since Founded Views --
 @login_required
 def performance_since_founded_view(request):
-    combined_chart = "FundCharts_Store/Combined_All_Funds_Since_2016_to_2025-12-31.html"
-    
     context = {
-        'combined_chart': combined_chart,
+        'combined_chart_url': chart_url('line', 'ALL', 'Past_since_2016'),
         'back_url': get_back_url(request),
     }
     return render(request, 'invest_reviews/performance_since_founded.html', context)
@@ -288,11 +295,9 @@ def fund_individual_since_founded_view(request, fund_key):
     if fund_key not in ['A', 'B', 'C', 'D']:
         return redirect('invest_reviews:performance_since_founded')
     
-    chart_file = f"{fund_key}_Since_2016_to_2025-12-31.html"  # correct filename
-    
     context = {
         'fund_key': fund_key,
-        'chart_path': f"FundCharts_Store/{chart_file}",
+        'chart_url': chart_url('line', fund_key, 'Past_since_2016'),
         'back_url': get_back_url(request),
     }
     return render(request, 'invest_reviews/fund_individual.html', context)
@@ -300,10 +305,8 @@ def fund_individual_since_founded_view(request, fund_key):
 # -- This Year Performance Views --
 @login_required
 def this_year_performance_view(request):
-    combined_chart = "FundCharts_Store/Combined_All_Funds_Since_this_year_to_2025-12-31.html"
-    
     context = {
-        'combined_chart': combined_chart,
+        'combined_chart_url': chart_url('line', 'ALL', 'Past_since_this_year'),
         'back_url': get_back_url(request),
     }
     return render(request, 'invest_reviews/this_year_performance.html', context)
@@ -313,11 +316,9 @@ def fund_individual_this_year_view(request, fund_key):
     if fund_key not in ['A', 'B', 'C', 'D']:
         return redirect('invest_reviews:this_year_performance')
     
-    chart_file = f"{fund_key}_Since_this_year_to_2025-12-31.html"
-    
     context = {
         'fund_key': fund_key,
-        'chart_path': f"FundCharts_Store/{chart_file}",
+        'chart_url': chart_url('line', fund_key, 'Past_since_this_year'),
         'back_url': get_back_url(request),
     }
     return render(request, 'invest_reviews/fund_individual_this_year.html', context)
@@ -328,6 +329,35 @@ def fund_individual_this_year_view(request, fund_key):
 
 
 
+# -- Chart files, built on first request --
+@login_required
+@xframe_options_sameorigin
+def fund_chart_view(request, version, kind, fund_key, period, as_of):
+    """Serve a stored chart; the URL holds the price data version so the file never changes."""
+    if not is_valid_chart(kind, fund_key, period):
+        raise Http404("Unknown chart")
+    try:
+        as_of_date = datetime.strptime(as_of, '%Y-%m-%d')
+    except ValueError:
+        raise Http404("Invalid date")
+    
+    if version != get_price_store().version:
+        # Old page, send it to the chart of the current prices
+        return redirect(chart_url(kind, fund_key, period, as_of_date))
+    
+    chart_file, is_current = open_chart_file(kind, fund_key, period, as_of_date)
+    if chart_file is None:
+        raise Http404("No data for this date")
+    
+    response = FileResponse(chart_file, content_type='text/html; charset=utf-8')
+    if is_current:
+        patch_cache_control(response, private=True, max_age=31536000, immutable=True)
+    else:
+        # Older prices while the current chart is rebuilt
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 #  -- More to See View --
 @login_required
 def more_to_see_view(request):
@@ -339,4 +369,138 @@ def more_to_see_view(request):
 
 @login_required
 def test_this_year_fund(request, fund_key):
-    return HttpResponse(f"Test OK! You clicked Fund {fund_key}")
\ No newline at end of file
+    return HttpResponse(f"Test OK! You clicked Fund {fund_key}")
+
+
+# -- Chart data API (JSON for static/js/fund_charts.js) --
+
+def _api_funds(request, price_store):
+    """Fund columns from ?funds=A,B (default all), only those with prices."""
+    keys = [k.strip().upper() for k in request.GET.get('funds', 'A,B,C,D').split(',') if k.strip()]
+    return [fund_map[k] for k in keys if k in fund_map and price_store.has_fund(fund_map[k])]
+
+def _api_date_index(request, price_store, param, side, default_index):
+    """Row index of the trading day nearest to ?param=YYYY-MM-DD, or default_index if not given."""
+    value = request.GET.get(param)
+    if not value:
+        return default_index
+    try:
+        requested = datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        return None
+    return price_store.resolve_date_index(requested, side=side)
+
+def _api_max_points(request):
+    try:
+        return int(request.GET.get('max_points', 0)) or None
+    except ValueError:
+        return None
+
+def _api_day(price_store, i):
+    return str(price_store.dates[i])
+
+def _api_float(value):
+    """JSON has no NaN, missing prices are sent as null."""
+    value = float(value)
+    return None if value != value else value
+
+@login_required
+def fund_series_api(request):
+    """Daily prices of funds between ?start and ?end, with the % change of each."""
+    price_store = get_price_store()
+    fund_cols = _api_funds(request, price_store)
+    if not fund_cols or not len(price_store.dates):
+        return JsonResponse({'error': 'No fund data.'}, status=400)
+    
+    i_start = _api_date_index(request, price_store, 'start', 'after', 0)
+    i_end = _api_date_index(request, price_store, 'end', 'before', len(price_store.dates) - 1)
+    if i_start is None or i_end is None or i_start > i_end:
+        return JsonResponse({'error': 'No data between start and end date.'}, status=400)
+    
+    dates = price_store.dates[i_start:i_end + 1]
+    series = []
+    pct_changes = {}
+    for col in fund_cols:
+        values = price_store.values[i_start:i_end + 1, price_store.fund_index[col]]
+        series.append((col, short_names[col], values))
+        pct_changes[col] = _api_float(calculate_pct_change(values[0], values[-1]))
+    
+    payload = series_payload(dates, series, _api_max_points(request))
+    payload.update({
+        'chart': 'line',
+        'start': _api_day(price_store, i_start),
+        'end': _api_day(price_store, i_end),
+        'long_names': {col: long_names[col] for col in fund_cols},
+        'pct_changes': pct_changes,
+    })
+    return JsonResponse(payload)
+
+@login_required
+def portfolio_series_api(request):
+    """Portfolio value line and current holdings for the PortfolioForm fields given as GET parameters."""
+    form = PortfolioForm(request.GET)
+    if not form.is_valid():
+        return JsonResponse({'error': form.errors.get_json_data()}, status=400)
+    
+    price_store = get_price_store()
+    i_start = price_store.resolve_date_index(form.cleaned_data['start_date'], side='after')
+    i_end = price_store.resolve_date_index(form.cleaned_data['current_date'], side='before')
+    if i_start is None or i_end is None or i_start > i_end:
+        return JsonResponse({'error': 'No data between start and current date.'}, status=400)
+    
+    invested_amount = form.cleaned_data['invested_amount']
+    weights = {fund_map[k]: form.cleaned_data[f'pct_{k}'] / 100.0 for k in fund_map}
+    start_date = pd.Timestamp(price_store.dates[i_start])
+    current_date = pd.Timestamp(price_store.dates[i_end])
+    dates, portfolio_values, fund_values = portfolio_time_series(
+        price_store.frame, start_date, current_date, invested_amount, weights
+    )
+    
+    series = [('Portfolio', 'Your Portfolio', portfolio_values)]
+    series += [(col, short_names[col], values) for col, values in fund_values.items()]
+    
+    holdings = {col: float(values[-1]) for col, values in fund_values.items()}
+    port_current = float(portfolio_values[-1])
+    
+    payload = series_payload(dates.values, series, _api_max_points(request))
+    payload.update({
+        'chart': 'line',
+        'start': _api_day(price_store, i_start),
+        'end': _api_day(price_store, i_end),
+        'invested_amount': invested_amount,
+        'current_value': port_current,
+        'return_pct': (port_current - invested_amount) / invested_amount * 100 if invested_amount else 0,
+        'holdings': [
+            {'name': col, 'label': short_names[col], 'long_name': long_names[col], 'value': value,
+             'pct': value / port_current * 100 if port_current else 0}
+            for col, value in holdings.items()
+        ],
+    })
+    return JsonResponse(payload)
+
+@login_required
+def period_returns_api(request):
+    """% change of funds over each period (?periods=Past_12_months,...) ending at ?end."""
+    price_store = get_price_store()
+    fund_cols = _api_funds(request, price_store)
+    if not fund_cols or not len(price_store.dates):
+        return JsonResponse({'error': 'No fund data.'}, status=400)
+    
+    i_end = _api_date_index(request, price_store, 'end', 'before', len(price_store.dates) - 1)
+    if i_end is None:
+        return JsonResponse({'error': 'No data before end date.'}, status=400)
+    
+    choices = [c for c in request.GET.get('periods', ','.join(PERIOD_CHOICES)).split(',') if c in PERIOD_CHOICES]
+    
+    # Precomputed table when ready, otherwise computed for this date only
+    periods = [
+        {'name': choice, 'label': PERIOD_CHOICES[choice], 'start': start, 'returns': returns}
+        for choice, start, returns in period_returns_at(i_end, choices, fund_cols)
+    ]
+    
+    return JsonResponse({
+        'chart': 'bar',
+        'end': _api_day(price_store, i_end),
+        'funds': [{'name': col, 'label': short_names[col]} for col in fund_cols],
+        'periods': periods,
+    })
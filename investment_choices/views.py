@@ -9,10 +9,11 @@ import plotly.express as px
 # Import fund briefs
 from .fundbriefing import fund_briefs
 
-# Load data (CSV in app folder)
-df = pd.read_csv("funds_daily_2015_to_2036.csv")
-df['Date'] = pd.to_datetime(df['Date'])
-df = df.set_index('Date').sort_index()
+# Vectorized portfolio valuation
+from invest_reviews.portfolio_engine import portfolio_time_series
+
+# Shared fund data, loaded once per process (see investment_datas.price_store)
+from investment_datas.price_store import get_price_store
 
 # Fund mappings
 short_names = {
@@ -133,7 +134,7 @@ def create_l_chart(data, fund_cols, title, start_date, current_date, is_combined
     
     return fig
 
-def calculate_portfolio_value(start_date, current_date, invested_amount, weights):
+def calculate_portfolio_value(df, start_date, current_date, invested_amount, weights):
     start_row = df.loc[start_date]
     current_row = df.loc[current_date]
     port_start = invested_amount
@@ -180,6 +181,9 @@ def invest_reviews_view(request):
 
 @login_required
 def portfolio_view(request):
+    price_store = get_price_store()
+    df = price_store.frame
+
     if request.method == 'POST':
         form = PortfolioForm(request.POST)
         if form.is_valid():
@@ -192,41 +196,35 @@ def portfolio_view(request):
                 'Fund_D': form.cleaned_data['pct_D'] / 100.0
             }
             start_date = form.cleaned_data['start_date']
+
+            # Nearest trading days (binary search), so weekends / holidays work
+            start_date = price_store.resolve_date(start_date, side='after')
+            current_date = price_store.resolve_date(current_date, side='before')
+            if start_date is None or current_date is None or start_date > current_date:
+                return render(request, 'invest_reviews/portfolio.html', {'form': form})
             
             active_funds = [f for f, w in weights.items() if w > 0]
             port_start, port_current, gain, return_pct, current_holdings, current_alloc_pct = calculate_portfolio_value(
-                start_date, current_date, invested_amount, weights
+                df, start_date, current_date, invested_amount, weights
             )
             
-            dates = df.loc[start_date:current_date].index
-            portfolio_values = []
-            for dt in dates:
-                row = df.loc[dt]
-                port_val = invested_amount
-                for fund_col, weight in weights.items():
-                    growth = row[fund_col] / df.loc[start_date, fund_col] if df.loc[start_date, fund_col] != 0 else 1.0
-                    port_val += (invested_amount * weight) * (growth - 1)
-                portfolio_values.append(port_val)
+            dates, portfolio_values, fund_values = portfolio_time_series(
+                df, start_date, current_date, invested_amount, weights
+            )
             
             fig_port = go.Figure()
             fig_port.add_trace(go.Scatter(x=dates, y=portfolio_values, name="Your Portfolio", line=dict(width=3, color='royalblue')))
             
             fund_colors = {'Fund_A': '#1f77b4', 'Fund_B': '#2ca02c', 'Fund_C': '#ff7f0e', 'Fund_D': '#9467bd'}
             for fund_col in active_funds:
-                fund_values = []
-                for dt in dates:
-                    start_val = df.loc[start_date, fund_col]
-                    curr_val = df.loc[dt, fund_col]
-                    growth = curr_val / start_val if start_val != 0 else 1.0
-                    fund_values.append(invested_amount * weights[fund_col] * growth)
-                fig_port.add_trace(go.Scatter(x=dates, y=fund_values, name=short_names[fund_col], line=dict(dash='dash', color=fund_colors[fund_col]), visible=False))
+                fig_port.add_trace(go.Scatter(x=dates, y=fund_values[fund_col], name=short_names[fund_col], line=dict(dash='dash', color=fund_colors[fund_col]), visible=False))
             
-            min_port = min(portfolio_values)
+            min_port = portfolio_values.min()
             y_min = min(0, min_port * 0.95) if min_port < invested_amount else 0
             fig_port.update_layout(
-                title=f"Your Portfolio Value Change from {start_date} to {current_date}",
+                title=f"Your Portfolio Value Change from {start_date.date()} to {current_date.date()}",
                 xaxis_title="Date", yaxis_title="Portfolio Value (USD)",
-                yaxis=dict(range=[y_min, max(portfolio_values) * 1.05]),
+                yaxis=dict(range=[y_min, portfolio_values.max() * 1.05]),
                 legend=dict(x=0, y=1.1, orientation='h'),
                 margin=dict(l=250, r=200, t=120),
                 updatemenus=[dict(type="buttons", direction="left", x=0.1, y=1.25, pad=dict(t=50), showactive=True,
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class InvestmentDatasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'investment_datas'
+
+    def ready(self):
+        import investment_datas.signals
@@ -0,0 +1,246 @@
+### geometric brownian motion model of the synthetic fund prices
+### the same model project_info/Howard/FundValDataGenerator.py used
+### to generate funds_daily_2015_to_2036.csv, shared by
+###   invest_reviews.projection : monte carlo projection of a portfolio
+###   generate_fund_prices      : seed search and csv generation
+### kept free of django imports so pool workers can import it
+
+from datetime import datetime
+
+import numpy as np
+
+
+START_DATE = datetime(2015, 12, 31)
+END_DATE = datetime(2036, 12, 31)
+BASE_VALUE = 100.00
+
+### first day of the second regime
+CHANGE_DATE = datetime(2026, 1, 1)
+
+### annual return / volatility per fund, before and from CHANGE_DATE
+FUND_CONFIGS = {
+    'Fund_A': {
+        '2016-2025': {'return': 0.15, 'vol': 0.18},
+        '2026-2036': {'return': 0.10, 'vol': 0.11},
+    },
+    'Fund_B': {
+        '2016-2025': {'return': 0.10, 'vol': 0.12},
+        '2026-2036': {'return': 0.08, 'vol': 0.10},
+    },
+    'Fund_C': {
+        '2016-2025': {'return': 0.18, 'vol': 0.22},
+        '2026-2036': {'return': 0.15, 'vol': 0.18},
+    },
+    'Fund_D': {
+        'whole_period': {'return': 0.025, 'vol': 0.005},
+    },
+}
+
+### normal draws (paths x steps x funds) held in memory at once
+SIMULATION_CHUNK_CELLS = 2000000
+
+### spawn keys of the seed search draws and of the price path draws,
+### kept apart so no candidate's path reuses a batch's draws
+SEARCH_SPAWN_KEY = 0
+PATH_SPAWN_KEY = 1
+
+
+def gbm_daily_params (annual_return, annual_vol) :
+    '''
+    Returns (mu_daily, sigma_daily) of the daily log returns
+    for an annual return / volatility, calendar days.
+    '''
+    mu_annual = np.log(1 + annual_return) + 0.5 * annual_vol ** 2
+
+    return mu_annual / 365, annual_vol / np.sqrt(365)
+# end def gbm_daily_params()
+
+def regime_params (fund_name, on_date) :
+    '''
+    Returns (annual_return, annual_vol) of fund_name on on_date.
+    '''
+    config = FUND_CONFIGS[fund_name]
+
+    if 'whole_period' in config:
+        params = config['whole_period']
+    elif np.datetime64(on_date, 'D') < np.datetime64(CHANGE_DATE, 'D'):
+        params = config['2016-2025']
+    else:
+        params = config['2026-2036']
+
+    return params['return'], params['vol']
+# end def regime_params()
+
+def daily_log_params (fund_names, dates) :
+    '''
+    Returns (mu, sigma), arrays of shape (len(dates) - 1, len(fund_names)).
+    Row k holds the log return parameters of the step from
+    dates[k] to dates[k + 1], taken from the regime of dates[k + 1].
+    '''
+    step_ends = np.asarray(dates, dtype='datetime64[D]')[1:]
+    is_before_change = step_ends < np.datetime64(CHANGE_DATE, 'D')
+
+    mu = np.empty((len(step_ends), len(fund_names)))
+    sigma = np.empty((len(step_ends), len(fund_names)))
+
+    for f, fund_name in enumerate(fund_names):
+        mu_pre, sigma_pre = gbm_daily_params(*regime_params(fund_name, START_DATE))
+        mu_post, sigma_post = gbm_daily_params(*regime_params(fund_name, CHANGE_DATE))
+
+        mu[:, f] = np.where(is_before_change, mu_pre, mu_post)
+        sigma[:, f] = np.where(is_before_change, sigma_pre, sigma_post)
+
+    return mu, sigma
+# end def daily_log_params()
+
+def coarse_log_params (mu, sigma, sample_rows) :
+    '''
+    Log return parameters between the date rows sample_rows
+    (sorted, starting at 0) from daily parameters.
+
+    The log return over many days is normal with the summed means
+    and variances, so simulating the coarse steps gives exactly the
+    distribution of the daily model at the sampled dates.
+    '''
+    zero = np.zeros((1, mu.shape[1]))
+    mu_sums = np.concatenate((zero, np.cumsum(mu, axis=0)))
+    var_sums = np.concatenate((zero, np.cumsum(sigma ** 2, axis=0)))
+
+    return np.diff(mu_sums[sample_rows], axis=0), np.sqrt(np.diff(var_sums[sample_rows], axis=0))
+# end def coarse_log_params()
+
+def simulate_portfolio_growth (weights, mu, sigma, n_paths, seed, chunk_cells=SIMULATION_CHUNK_CELLS) :
+    '''
+    Buy and hold growth of 1 split by weights (array per fund column)
+    along n_paths simulated paths of the steps in mu / sigma.
+
+    Returns array (n_paths, steps + 1), column 0 is 1.
+
+    Paths are drawn in chunks of at most chunk_cells normals from one
+    numpy Generator seeded with seed. Draws fill chunks in path order,
+    so results do not depend on the chunk size.
+    '''
+    rng = np.random.default_rng(seed)
+
+    n_steps, n_funds = mu.shape
+    paths_per_chunk = max(1, chunk_cells // max(1, n_steps * n_funds))
+
+    growth = np.empty((n_paths, n_steps + 1))
+    growth[:, 0] = 1.0
+
+    for a in range(0, n_paths, paths_per_chunk):
+        b = min(n_paths, a + paths_per_chunk)
+
+        log_returns = rng.standard_normal((b - a, n_steps, n_funds))
+        log_returns *= sigma
+        log_returns += mu
+
+        # cumulative log return -> growth of each fund, weighted sum over funds
+        np.cumsum(log_returns, axis=1, out=log_returns)
+        np.exp(log_returns, out=log_returns)
+        growth[a:b, 1:] = log_returns @ weights
+
+    return growth
+# end def simulate_portfolio_growth()
+
+def pre_change_steps (dates) :
+    '''
+    Number of daily steps ending before CHANGE_DATE,
+    the steps of the first regime.
+    '''
+    return int(np.count_nonzero(np.asarray(dates, dtype='datetime64[D]')[1:] < np.datetime64(CHANGE_DATE, 'D')))
+# end def pre_change_steps()
+
+def seed_search_params (fund_names, dates) :
+    '''
+    Everything search_seed_batch() needs, arrays of shape (2, funds)
+    for the first / second regime:
+        mu, sigma : distribution of the summed daily log returns
+        targets   : target CAGR in %
+        years     : (2,) years of each regime, as FundValDataGenerator.py counted them
+    '''
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    n_pre = pre_change_steps(dates)
+
+    mu, sigma = daily_log_params(fund_names, dates)
+    sum_mu, sum_sigma = coarse_log_params(mu, sigma, [0, n_pre, len(dates) - 1])
+
+    targets = np.array([
+        [regime_params(fund_name, START_DATE)[0] * 100 for fund_name in fund_names],
+        [regime_params(fund_name, CHANGE_DATE)[0] * 100 for fund_name in fund_names],
+    ])
+
+    # calendar years: 2015-12-31 to 2025-12-31 is 10, to 2036-12-31 another 11
+    year_numbers = dates[[0, n_pre, -1]].astype('datetime64[Y]').astype('int64')
+    years = np.diff(year_numbers).astype('float64')
+
+    return {'mu' : sum_mu, 'sigma' : sum_sigma, 'targets' : targets, 'years' : years}
+# end def seed_search_params()
+
+def search_seed_batch (base_seed, batch, batch_size, params, tolerance, stop_error) :
+    '''
+    Scores candidates batch * batch_size .. + batch_size - 1.
+
+    A candidate is the pair of summed log returns (first / second
+    regime) of every fund, all a CAGR check needs. The sum of the daily
+    normal log returns is itself normal, so a candidate is 2 draws
+    per fund instead of a full daily path.
+
+    error is the sum of |CAGR - target| in % over funds and regimes,
+    a candidate is close when every difference is within tolerance.
+
+    Returns (batch, candidate, error, log_return_sums, stopped):
+    the first close candidate with error below stop_error (stopped True),
+    else the close candidate with the lowest error, candidate None if none.
+    '''
+    seed_sequence = np.random.SeedSequence(base_seed, spawn_key=(SEARCH_SPAWN_KEY, batch))
+    rng = np.random.default_rng(seed_sequence)
+
+    sums = rng.standard_normal((batch_size,) + params['mu'].shape) * params['sigma'] + params['mu']
+
+    cagrs = (np.exp(sums / params['years'][:, None]) - 1) * 100
+    diffs = np.abs(cagrs - params['targets'])
+    errors = diffs.sum(axis=(1, 2))
+    close = (diffs <= tolerance).all(axis=(1, 2))
+
+    stops = np.flatnonzero(close & (errors < stop_error))
+
+    if len(stops):
+        j = int(stops[0])
+        stopped = True
+    elif close.any():
+        j = int(np.argmin(np.where(close, errors, np.inf)))
+        stopped = False
+    else:
+        return batch, None, None, None, False
+
+    return batch, batch * batch_size + j, float(errors[j]), sums[j], stopped
+# end def search_seed_batch()
+
+def generate_prices (fund_names, dates, base_seed, candidate, log_return_sums) :
+    '''
+    Daily prices (len(dates), funds) of a candidate of search_seed_batch().
+
+    Daily log returns are drawn from the candidate's own seed, then each
+    regime's returns are shifted by an equal amount so they add up to
+    log_return_sums: the path is a Brownian bridge between the searched
+    values, which is exactly the daily model given those sums.
+    '''
+    dates = np.asarray(dates, dtype='datetime64[D]')
+    n_pre = pre_change_steps(dates)
+
+    mu, sigma = daily_log_params(fund_names, dates)
+
+    seed_sequence = np.random.SeedSequence(base_seed, spawn_key=(PATH_SPAWN_KEY, candidate))
+    rng = np.random.default_rng(seed_sequence)
+
+    log_returns = rng.standard_normal(mu.shape) * sigma + mu
+
+    for k, (a, b) in enumerate(((0, n_pre), (n_pre, len(log_returns)))):
+        if b > a:
+            log_returns[a:b] += (log_return_sums[k] - log_returns[a:b].sum(axis=0)) / (b - a)
+
+    zero = np.zeros((1, len(fund_names)))
+
+    return BASE_VALUE * np.exp(np.concatenate((zero, np.cumsum(log_returns, axis=0))))
+# end def generate_prices()
@@ -0,0 +1,123 @@
+# generate_fund_prices.py - Regenerate the synthetic daily fund prices csv
+#
+#   python manage.py generate_fund_prices
+#   python manage.py generate_fund_prices --seeds 100000 --base-seed 7 --workers 4 --output /tmp/funds.csv
+#
+# Replaces the seed search of project_info/Howard/FundValDataGenerator.py.
+# Candidates are scored on their summed log returns only (see
+# fund_generator.search_seed_batch), in batches spread over a process pool.
+# Batches are taken in order, so the chosen candidate does not depend on
+# the number of workers.
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from config.settings import DEFAULT_DATA_ROOT
+from investment_datas import fund_generator
+from investment_datas.price_store import FUNDS_DAILY_CSV
+
+
+class Command(BaseCommand):
+    help = "Search seeds of the fund price model for CAGRs close to target and write the daily prices csv."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seeds', type=int, default=10000,
+                            help="Candidates to search at most (default: 10000)")
+        parser.add_argument('--batch-size', type=int, default=1000, dest='batch_size',
+                            help="Candidates scored per task (default: 1000)")
+        parser.add_argument('--base-seed', type=int, default=0, dest='base_seed',
+                            help="Seed all candidates are derived from (default: 0)")
+        parser.add_argument('--tolerance', type=float, default=3.0,
+                            help="Largest |CAGR - target| in %% of any fund and period (default: 3)")
+        parser.add_argument('--stop-error', type=float, default=10.0, dest='stop_error',
+                            help="Stop at the first candidate with a total error below this (default: 10)")
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes (default: CPU count, 1 searches in this process)")
+        parser.add_argument('--output', default=os.path.join(DEFAULT_DATA_ROOT, FUNDS_DAILY_CSV),
+                            help="Csv file to write (default: the price store's default_data csv)")
+
+    def handle(self, *args, **options):
+        seeds = options['seeds']
+        if seeds < 1:
+            raise CommandError("--seeds must be at least 1")
+        batch_size = max(1, min(options['batch_size'], seeds))
+
+        dates = pd.date_range(fund_generator.START_DATE, fund_generator.END_DATE, freq='D')
+        fund_names = list(fund_generator.FUND_CONFIGS)
+        params = fund_generator.seed_search_params(fund_names, dates.values)
+        search_args = (params, options['tolerance'], options['stop_error'])
+
+        batches = [(batch, min(batch_size, seeds - batch * batch_size)) for batch in range((seeds + batch_size - 1) // batch_size)]
+        workers = max(1, min(options['workers'], len(batches)))
+
+        self.stdout.write(f"Searching {seeds} candidates in {len(batches)} batches with {workers} worker(s)")
+        started = time.perf_counter()
+
+        if workers == 1:
+            results = (fund_generator.search_seed_batch(options['base_seed'], batch, size, *search_args) for batch, size in batches)
+            best, searched = self._best(results, batch_size)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(fund_generator.search_seed_batch, options['base_seed'], batch, size, *search_args)
+                           for batch, size in batches]
+                best, searched = self._best((future.result() for future in futures), batch_size)
+                # Stopped early: drop the batches not started yet
+                pool.shutdown(wait=True, cancel_futures=True)
+
+        search_seconds = time.perf_counter() - started
+        searched = min(searched, seeds)
+        if best is None:
+            raise CommandError(f"No candidate within {options['tolerance']}% of every target in {searched} candidates, "
+                               f"try more --seeds or a higher --tolerance")
+
+        candidate, error, log_return_sums = best
+        self.stdout.write(f"Using candidate {candidate} with total error {error:.2f} "
+                          f"({searched} candidates searched in {search_seconds:.2f}s)")
+
+        prices = fund_generator.generate_prices(fund_names, dates.values, options['base_seed'], candidate, log_return_sums)
+
+        df_daily = pd.DataFrame(np.round(prices, 2), columns=fund_names)
+        df_daily.insert(0, 'Date', dates.strftime('%Y-%m-%d'))
+
+        # Write next to the target and swap it in, the price store may be reading the file
+        output = options['output']
+        tmp_path = f"{output}.tmp{os.getpid()}"
+        df_daily.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, output)
+
+        self._report_cagrs(df_daily, fund_names, params)
+        self.stdout.write(self.style.SUCCESS(f"Daily prices written to {output} in {time.perf_counter() - started:.2f}s"))
+
+    def _best(self, results, batch_size):
+        """(candidate, error, log_return_sums) of the best result taken in batch order, and candidates searched.
+
+        Same choice as a one by one scan: the first candidate below --stop-error,
+        otherwise the lowest error (the earliest one on ties).
+        """
+        best = None
+        searched = 0
+        for batch, candidate, error, log_return_sums, stopped in results:
+            searched = (batch + 1) * batch_size
+            if candidate is not None and (best is None or error < best[1]):
+                best = (candidate, error, log_return_sums)
+            if stopped:
+                searched = candidate + 1
+                break
+        return best, searched
+
+    def _report_cagrs(self, df_daily, fund_names, params):
+        """CAGR of every fund per period from the written (rounded) prices, next to its target."""
+        n_pre = fund_generator.pre_change_steps(pd.to_datetime(df_daily['Date']).values)
+        rows = [0, n_pre, len(df_daily) - 1]
+        for p, label in enumerate(("first period", "second period")):
+            self.stdout.write(f"=== CAGRs {df_daily['Date'][rows[p]]} to {df_daily['Date'][rows[p + 1]]} ({label}) ===")
+            for f, fund_name in enumerate(fund_names):
+                start = df_daily[fund_name][rows[p]]
+                end = df_daily[fund_name][rows[p + 1]]
+                rate = ((end / start) ** (1 / params['years'][p]) - 1) * 100
+                self.stdout.write(f"{fund_name}: {rate:5.2f}% (target {params['targets'][p, f]:5.2f}%, end value {end:,.2f})")
@@ -10,6 +10,15 @@ class InvestmentData (models.Model) :
     investment_date = models.DateTimeField(blank=True, null=True)
     investment_price = models.FloatField(blank=True, null=True)
 
+    class Meta :
+        # one price per fund per day, also the index for (choice, date) lookups
+        constraints = [
+            models.UniqueConstraint (
+                fields = ['investment_choice', 'investment_date'],
+                name = 'unique_investment_choice_date',
+            ),
+        ]
+
     def __str__ (self) :
         return str(self.investment_price)
 
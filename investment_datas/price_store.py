@@ -0,0 +1,330 @@
+
+### process wide store of daily fund prices
+### loaded once per process instead of once per request
+
+import os
+import hashlib
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from django.db import DatabaseError
+from django.db.models import Count, Max, Sum
+
+from config.settings import DEFAULT_DATA_ROOT
+from config.settings import TIME_ZONE
+
+from investment_datas.models import InvestmentData
+
+
+### predefined prices file, same one used by djapp_import_data
+FUNDS_DAILY_CSV = 'funds_daily_2015_to_2036.csv'
+
+### seconds between two checks of the InvestmentData table
+DB_CHECK_SECONDS = 5
+
+
+def to_day (value) :
+    '''
+    Converts a date / datetime / string to numpy datetime64[D].
+    Pass local dates, aware datetimes are not converted.
+    '''
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+# end def to_day()
+
+def to_days (values) :
+    '''
+    Converts many dates to a numpy datetime64[D] array.
+    '''
+    return np.array([to_day(value) for value in values], dtype='datetime64[D]')
+# end def to_days()
+
+
+class FundPriceStore () :
+    '''
+    Daily fund prices held as one sorted date array
+    and one float64 array with a column per fund.
+    '''
+    def __init__ (self, frame, version, source) :
+        self.frame = frame
+        self.version = version
+        self.source = source
+        self.dates = frame.index.values.astype('datetime64[D]')
+        self.fund_names = list(frame.columns)
+        self.values = frame.to_numpy(dtype='float64')
+        self.fund_index = {name : i for i, name in enumerate(self.fund_names)}
+
+    def has_fund (self, fund_name) :
+        return fund_name in self.fund_index
+
+    def get_price (self, fund_name, on_date) :
+        '''
+        Returns price of fund_name on exactly on_date,
+        or None if there is no price on that date.
+        '''
+        if fund_name not in self.fund_index:
+            return None
+
+        day = to_day(on_date)
+        i = np.searchsorted(self.dates, day)
+
+        if i >= len(self.dates) or self.dates[i] != day:
+            return None
+
+        return self._price_at(i, fund_name)
+
+    def resolve_date_index (self, on_date, side='before') :
+        '''
+        Binary search for the trading day nearest to on_date.
+        side='before' : last date on or before on_date
+        side='after'  : first date on or after on_date
+        Returns row index into dates / values, or None if out of range.
+        '''
+        day = to_day(on_date)
+
+        if side == 'before':
+            i = np.searchsorted(self.dates, day, side='right') - 1
+            return int(i) if i >= 0 else None
+        elif side == 'after':
+            i = np.searchsorted(self.dates, day, side='left')
+            return int(i) if i < len(self.dates) else None
+        else:
+            raise ValueError("side must be 'before' or 'after'")
+
+    def resolve_date (self, on_date, side='before') :
+        '''
+        Returns the nearest trading day as pd.Timestamp, or None.
+        '''
+        i = self.resolve_date_index(on_date, side)
+
+        if i is None:
+            return None
+
+        return pd.Timestamp(self.dates[i])
+
+    def price_on_or_before (self, fund_name, on_date) :
+        '''
+        Returns (trading date, price) of the last price on or before on_date,
+        or None if there is none.
+        '''
+        return self._nearest_price(fund_name, on_date, 'before')
+
+    def price_on_or_after (self, fund_name, on_date) :
+        '''
+        Returns (trading date, price) of the first price on or after on_date,
+        or None if there is none.
+        '''
+        return self._nearest_price(fund_name, on_date, 'after')
+
+    def prices_on_or_before (self, fund_name, dates) :
+        '''
+        Batch form of price_on_or_before for many dates.
+        Returns (trading dates, prices) numpy arrays,
+        NaT / NaN where there is no earlier price.
+        '''
+        return self._nearest_prices(fund_name, dates, 'before')
+
+    def prices_on_or_after (self, fund_name, dates) :
+        '''
+        Batch form of price_on_or_after for many dates.
+        Returns (trading dates, prices) numpy arrays,
+        NaT / NaN where there is no later price.
+        '''
+        return self._nearest_prices(fund_name, dates, 'after')
+
+    def _price_at (self, i, fund_name) :
+        price = self.values[i, self.fund_index[fund_name]]
+
+        if np.isnan(price):
+            return None
+
+        return float(price)
+
+    def _nearest_price (self, fund_name, on_date, side) :
+        if fund_name not in self.fund_index:
+            return None
+
+        i = self.resolve_date_index(on_date, side)
+
+        if i is None:
+            return None
+
+        price = self._price_at(i, fund_name)
+
+        if price is None:
+            return None
+
+        return pd.Timestamp(self.dates[i]).date(), price
+
+    def _nearest_prices (self, fund_name, dates, side) :
+        days = to_days(dates)
+        n = len(self.dates)
+
+        if side == 'before':
+            idx = np.searchsorted(self.dates, days, side='right') - 1
+            found = idx >= 0
+        else:
+            idx = np.searchsorted(self.dates, days, side='left')
+            found = idx < n
+
+        found_dates = np.full(len(days), np.datetime64('NaT'), dtype='datetime64[D]')
+        prices = np.full(len(days), np.nan)
+
+        if fund_name not in self.fund_index:
+            return found_dates, prices
+
+        found_dates[found] = self.dates[idx[found]]
+        prices[found] = self.values[idx[found], self.fund_index[fund_name]]
+
+        return found_dates, prices
+# end class FundPriceStore()
+
+
+_lock = threading.Lock()
+_store = None
+_csv_signature = None
+_db_signature = None
+_db_checked_at = 0.0
+_is_stale = False
+
+
+def _csv_path () :
+    return os.path.join(DEFAULT_DATA_ROOT, FUNDS_DAILY_CSV)
+
+def _read_csv_signature () :
+    '''
+    Returns mtime of the prices csv file, None if missing.
+    '''
+    try:
+        return os.stat(_csv_path()).st_mtime_ns
+    except OSError:
+        return None
+# end def _read_csv_signature()
+
+def _read_db_signature () :
+    '''
+    One aggregate query that changes whenever rows are
+    added, deleted or have their price / date edited.
+    Returns None if the table cannot be read.
+    '''
+    try:
+        agg = InvestmentData.objects.aggregate(
+            row_count   = Count('id'),
+            max_id      = Max('id'),
+            max_date    = Max('investment_date'),
+            price_sum   = Sum('investment_price'),
+        )
+    except DatabaseError:
+        return None
+
+    return (agg['row_count'], agg['max_id'], agg['max_date'], agg['price_sum'])
+# end def _read_db_signature()
+
+def _load_frame_from_csv () :
+    df = pd.read_csv(_csv_path())
+    df['Date'] = pd.to_datetime(df['Date'], format='%Y-%m-%d')
+    df = df.set_index('Date').sort_index()
+    return df.astype('float64')
+# end def _load_frame_from_csv()
+
+def _load_frame_from_db () :
+    '''
+    Pivot InvestmentData rows into one column per fund.
+    Dates are stored timezone-aware, convert to local dates.
+    '''
+    rows = InvestmentData.objects.filter(
+        investment_choice__isnull   = False,
+        investment_date__isnull     = False,
+    ).values_list(
+        'investment_choice__investment_name',
+        'investment_date',
+        'investment_price',
+    )
+
+    df = pd.DataFrame.from_records(list(rows), columns=['Fund', 'Date', 'Price'])
+
+    dates = pd.to_datetime(df['Date'], utc=True).dt.tz_convert(TIME_ZONE)
+    df['Date'] = dates.dt.tz_localize(None).dt.normalize()
+
+    df = df.pivot_table(index='Date', columns='Fund', values='Price', aggfunc='last')
+    df.columns.name = None
+    df = df.sort_index()
+    return df.astype('float64')
+# end def _load_frame_from_db()
+
+def _make_version (csv_signature, db_signature) :
+    text = f"{csv_signature}|{db_signature}"
+    return hashlib.md5(text.encode('utf-8')).hexdigest()[:12]
+
+def _load_store (csv_signature, db_signature) :
+    '''
+    Prices imported into the database are used when there are any,
+    otherwise fall back to the predefined csv file.
+    '''
+    if db_signature and db_signature[0]:
+        frame = _load_frame_from_db()
+        source = 'db'
+    else:
+        frame = _load_frame_from_csv()
+        source = 'csv'
+
+    return FundPriceStore(frame, _make_version(csv_signature, db_signature), source)
+# end def _load_store()
+
+def get_price_store () :
+    '''
+    Returns the shared FundPriceStore, reloading it first
+    if the csv file or the InvestmentData table changed.
+    '''
+    global _store, _csv_signature, _db_signature, _db_checked_at, _is_stale
+
+    csv_signature = _read_csv_signature()
+
+    now = time.monotonic()
+    check_db = _store is None or _is_stale or now - _db_checked_at >= DB_CHECK_SECONDS
+
+    if not check_db and csv_signature == _csv_signature:
+        return _store
+
+    with _lock:
+        if check_db:
+            db_signature = _read_db_signature()
+            _db_checked_at = now
+        else:
+            db_signature = _db_signature
+
+        if (
+            _store is None
+            or csv_signature != _csv_signature
+            or db_signature != _db_signature
+        ):
+            _store = _load_store(csv_signature, db_signature)
+            _csv_signature = csv_signature
+            _db_signature = db_signature
+
+        _is_stale = False
+
+        return _store
+# end def get_price_store()
+
+def get_fund_data () :
+    '''
+    Returns the shared prices DataFrame, indexed by Date.
+    Do not modify it in place, take a copy first.
+    '''
+    return get_price_store().frame
+# end def get_fund_data()
+
+def get_price_data_version () :
+    return get_price_store().version
+
+def mark_price_store_stale () :
+    '''
+    Called from InvestmentData signals so the next
+    get_price_store() re-checks the table right away.
+    '''
+    global _is_stale
+    _is_stale = True
+# end def mark_price_store_stale()
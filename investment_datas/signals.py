@@ -0,0 +1,10 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from .models import InvestmentData
+from .price_store import mark_price_store_stale
+
+# Only post_save: a post_delete receiver would stop Django from fast deleting
+# the whole table. Bulk deletes call mark_price_store_stale() themselves.
+@receiver(post_save, sender=InvestmentData)
+def investment_data_saved(sender, instance, **kwargs):
+    mark_price_store_stale()
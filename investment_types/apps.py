@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class InvestmentTypesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'investment_types'
+
+    def ready(self):
+        import investment_types.signals
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from investment_choices.models import InvestmentChoice
+from .models import InvestmentType
+from .utils import mark_investment_type_index_stale
+
+# Score ranges and fund lists of the recommendation come from the index
+@receiver(post_save, sender=InvestmentType)
+@receiver(post_delete, sender=InvestmentType)
+@receiver(post_save, sender=InvestmentChoice)
+@receiver(post_delete, sender=InvestmentChoice)
+def investment_types_changed(sender, instance, **kwargs):
+    mark_investment_type_index_stale()
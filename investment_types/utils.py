@@ -0,0 +1,212 @@
+
+### process wide interval index of InvestmentType score ranges
+### built once, rebuilt when types or choices change
+
+import threading
+import time
+
+from bisect import bisect_left
+from math import floor as math_floor
+
+from django.db.models import Count, Max, Sum
+
+from investment_types.models import InvestmentType
+from investment_choices.models import InvestmentChoice
+
+
+### seconds between two checks of the InvestmentType / InvestmentChoice tables
+DB_CHECK_SECONDS = 5
+
+
+def floor_to_tens (n) :
+    return int(math_floor(n / 10) * 10)
+
+
+class InvestmentTypeIndex () :
+    '''
+    Interval lookup of score -> investment types whose
+    investment_score_range_start <= score <= investment_score_range_end.
+
+    Range ends are sorted into breakpoints. Every breakpoint and every
+    open gap between two breakpoints has its precomputed list of types,
+    so lookup() is one binary search.
+    '''
+    def __init__ (self, investment_types, investment_choices) :
+        self.investment_types = [
+            investment_type for investment_type in investment_types
+            if investment_type.investment_score_range_start is not None
+            and investment_type.investment_score_range_end is not None
+        ]
+
+        self.choices_by_type_id = {}
+
+        for investment_choice in investment_choices:
+            self.choices_by_type_id.setdefault(investment_choice.investment_type_id, []).append(investment_choice)
+
+        points = set()
+
+        for investment_type in self.investment_types:
+            points.add(investment_type.investment_score_range_start)
+            points.add(investment_type.investment_score_range_end)
+
+        self.points = sorted(points)
+
+        # types covering exactly points[i]
+        self.point_types = [
+            self._covering(point, point)
+            for point in self.points
+        ]
+
+        # types covering the open gap points[i] .. points[i + 1]
+        self.gap_types = [
+            self._covering(self.points[i], self.points[i + 1])
+            for i in range(len(self.points) - 1)
+        ]
+
+    def _covering (self, low, high) :
+        return [
+            investment_type for investment_type in self.investment_types
+            if investment_type.investment_score_range_start <= low
+            and investment_type.investment_score_range_end >= high
+        ]
+
+    def lookup (self, score) :
+        '''
+        Returns list of InvestmentType matching score, sorted by range start.
+        '''
+        if score is None:
+            return []
+
+        i = bisect_left(self.points, score)
+
+        if i < len(self.points) and self.points[i] == score:
+            return self.point_types[i]
+
+        if 0 < i < len(self.points):
+            return self.gap_types[i - 1]
+
+        return []
+
+    def choices_for (self, investment_types) :
+        '''
+        Returns list of InvestmentChoice of the given types.
+        '''
+        investment_choices = []
+
+        for investment_type in investment_types:
+            investment_choices.extend(self.choices_by_type_id.get(investment_type.id, []))
+
+        return investment_choices
+
+    def allocation (self, score) :
+        '''
+        Returns prepared allocation of a normalised score:
+            investment_types    : matching InvestmentType list
+            investment_choices  : their InvestmentChoice list
+            inv_name_val_dict   : {investment_name : percentage string},
+                                  same average for every choice, floored to tens
+        '''
+        investment_types = self.lookup(score)
+        investment_choices = self.choices_for(investment_types)
+
+        # set to same inv_value
+        # use average
+        if len(investment_choices) != 0:
+            inv_value = floor_to_tens(100 / len(investment_choices))
+        else:
+            inv_value = 0
+
+        ### need to store string value into dictioinary for template html to use
+        inv_value = str(inv_value)
+
+        inv_name_val_dict = {
+            investment_choice.investment_name : inv_value
+            for investment_choice in investment_choices
+        }
+
+        return {
+            'investment_types'      : investment_types,
+            'investment_choices'    : investment_choices,
+            'inv_name_val_dict'     : inv_name_val_dict,
+        }
+# end class InvestmentTypeIndex()
+
+
+_lock = threading.Lock()
+_index = None
+_db_signature = None
+_db_checked_at = 0.0
+_is_stale = False
+
+
+def _read_db_signature () :
+    '''
+    Changes whenever types or choices are added, deleted
+    or have their ranges / type edited.
+    '''
+    types_agg = InvestmentType.objects.aggregate(
+        row_count   = Count('id'),
+        max_id      = Max('id'),
+        start_sum   = Sum('investment_score_range_start'),
+        end_sum     = Sum('investment_score_range_end'),
+    )
+
+    choices_agg = InvestmentChoice.objects.aggregate(
+        row_count   = Count('id'),
+        max_id      = Max('id'),
+        type_id_sum = Sum('investment_type'),
+    )
+
+    return (tuple(types_agg.values()), tuple(choices_agg.values()))
+# end def _read_db_signature()
+
+def _load_index () :
+    investment_types = InvestmentType.objects.order_by('investment_score_range_start', 'id')
+    investment_choices = InvestmentChoice.objects.filter(
+        investment_type__isnull = False
+    ).order_by('id')
+
+    return InvestmentTypeIndex(list(investment_types), list(investment_choices))
+# end def _load_index()
+
+def get_investment_type_index () :
+    '''
+    Returns the shared InvestmentTypeIndex, rebuilt first
+    if types or choices changed.
+    '''
+    global _index, _db_signature, _db_checked_at, _is_stale
+
+    now = time.monotonic()
+
+    if _index is not None and not _is_stale and now - _db_checked_at < DB_CHECK_SECONDS:
+        return _index
+
+    with _lock:
+        db_signature = _read_db_signature()
+        _db_checked_at = now
+
+        # signals also catch edits the signature does not see
+        if _index is None or _is_stale or db_signature != _db_signature:
+            _index = _load_index()
+            _db_signature = db_signature
+
+        _is_stale = False
+
+        return _index
+# end def get_investment_type_index()
+
+def get_investment_allocation (score) :
+    '''
+    Returns prepared allocation dictionary of a normalised score,
+    see InvestmentTypeIndex.allocation().
+    '''
+    return get_investment_type_index().allocation(score)
+# end def get_investment_allocation()
+
+def mark_investment_type_index_stale () :
+    '''
+    Called from InvestmentType / InvestmentChoice signals.
+    '''
+    global _is_stale
+    _is_stale = True
+# end def mark_investment_type_index_stale()
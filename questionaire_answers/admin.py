@@ -4,6 +4,8 @@ from django.contrib import admin
 
 from .models import QuestionaireAnswer
 
+from questionaires.utils import bump_questionaire_definitions_version
+
 class QuestionaireAnswerAdmin (admin.ModelAdmin) :
     list_display = ('questionaire', 'questionaire_answer', 'answer_score', 'answer_weight', 'sort_order')
     list_display_links = ('questionaire', )
@@ -11,5 +13,14 @@ class QuestionaireAnswerAdmin (admin.ModelAdmin) :
     search_fields = ('questionaire', 'questionaire_answer', 'answer_score')
     list_per_page = 25
 
+    # no post_delete signal receivers, bump the cached definitions here
+    def delete_model (self, request, obj) :
+        super().delete_model(request, obj)
+        bump_questionaire_definitions_version()
+
+    def delete_queryset (self, request, queryset) :
+        super().delete_queryset(request, queryset)
+        bump_questionaire_definitions_version()
+
 admin.site.register (QuestionaireAnswer, QuestionaireAnswerAdmin)
 
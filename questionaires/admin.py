@@ -4,6 +4,8 @@ from django.contrib import admin
 
 from .models import Questionaire
 
+from questionaires.utils import bump_questionaire_definitions_version
+
 class QuestionaireAdmin (admin.ModelAdmin) :
     list_display = ('questionaire_statement', 'questionaire_type', 'sort_order')
     list_display_links = ('questionaire_statement', )
@@ -11,6 +13,15 @@ class QuestionaireAdmin (admin.ModelAdmin) :
     search_fields = ('questionaire_statement', 'questionaire_type')
     list_per_page = 25
 
+    # no post_delete signal receivers, bump the cached definitions here
+    def delete_model (self, request, obj) :
+        super().delete_model(request, obj)
+        bump_questionaire_definitions_version()
+
+    def delete_queryset (self, request, queryset) :
+        super().delete_queryset(request, queryset)
+        bump_questionaire_definitions_version()
+
 
 admin.site.register (Questionaire, QuestionaireAdmin)
 
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class QuestionairesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'questionaires'
+
+    def ready(self):
+        import questionaires.signals
@@ -0,0 +1,13 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from questionaire_answers.models import QuestionaireAnswer
+from .models import Questionaire
+from .utils import bump_questionaire_definitions_version
+
+# Any change of questions or answers invalidates the cached definitions.
+# No post_delete receivers, they would turn off Django's fast delete;
+# delete functions and the admin bump the version themselves.
+@receiver(post_save, sender=Questionaire)
+@receiver(post_save, sender=QuestionaireAnswer)
+def questionaire_definitions_saved(sender, instance, **kwargs):
+    bump_questionaire_definitions_version()
@@ -1,9 +1,19 @@
 
+import threading
+import time
+
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db.models import Prefetch
+from django.db.models import Min
+from django.db.models import Max
+from django.db.models import F
+from django.dispatch import Signal
+
 from questionaires.models import Questionaire
 from questionaire_answers.models import QuestionaireAnswer
 
-from questionaires.choices import questionaire_types
-
 
 class QuestionairesAndQuestionaireAnswers () :
     def __init__ (self, questionaire, questionaire_answers) :
@@ -14,92 +24,213 @@ class QuestionairesAndQuestionaireAnswers () :
 def get_questionaires_and_questionaire_answers (questionaire_type):
     '''
     Returns python list of QuestionairesAndQuestionaireAnswers objects.
+    Two queries in total, answers are prefetched for all questions.
     '''
-    questionaires_and_questionaire_answers = []
-
     questionaires = Questionaire.objects.filter(
         questionaire_type = questionaire_type
     ).order_by(
         'sort_order'
-    )
-
-    for questionaire in questionaires:
-        questionaire_answers = QuestionaireAnswer.objects.filter(
-            questionaire = questionaire
-        ).order_by(
-            'sort_order'
+    ).prefetch_related(
+        Prefetch(
+            'questionaireanswer_set',
+            queryset = QuestionaireAnswer.objects.order_by('sort_order'),
         )
+    )
 
-        questionaires_and_questionaire_answers.append(
-            QuestionairesAndQuestionaireAnswers(
-                questionaire,
-                questionaire_answers
-            )
+    questionaires_and_questionaire_answers = [
+        QuestionairesAndQuestionaireAnswers(
+            questionaire,
+            # list from the prefetch cache, no query per question
+            list(questionaire.questionaireanswer_set.all())
         )
+        for questionaire in questionaires
+    ]
     
     return questionaires_and_questionaire_answers
 # end def get_questionaire_answers()
 
+### questionaire definitions only change when admin imports / deletes them,
+### cache them under a version number that is bumped on every change.
+### the version lives in the shared cache (settings.CACHES), so a bump
+### in one worker process is seen by all of them
+QUESTIONAIRE_DEFINITIONS_VERSION_KEY = 'questionaire_definitions_version'
+
+### cached definitions expire anyway after this, in case a change
+### was made without a bump (e.g. directly in the database)
+QUESTIONAIRE_DEFINITIONS_CACHE_SECONDS = 3600
+
+### sent after every bump, for data derived from the definitions
+### that is stored outside the cache
+questionaire_definitions_changed = Signal()
+
+def _new_questionaire_definitions_version ():
+    # time based, so it never reuses a number of an evicted version key
+    return int(time.time() * 1000)
+
+def get_questionaire_definitions_version ():
+    '''
+    Returns current version number of questionaire definitions.
+    '''
+    version = cache.get(QUESTIONAIRE_DEFINITIONS_VERSION_KEY)
+
+    if version is None:
+        cache.add(QUESTIONAIRE_DEFINITIONS_VERSION_KEY, _new_questionaire_definitions_version(), None)
+        version = cache.get(QUESTIONAIRE_DEFINITIONS_VERSION_KEY)
+
+    return version
+# end def get_questionaire_definitions_version()
+
+### per thread state of questionaire_definitions_batch()
+_batch_state = threading.local()
+
+@contextmanager
+def questionaire_definitions_batch ():
+    '''
+    Bumps inside the block, e.g. the save signal of every imported row,
+    are collected into one bump when the block ends.
+    '''
+    depth = getattr(_batch_state, 'depth', 0)
+
+    if depth == 0:
+        _batch_state.pending = False
+
+    _batch_state.depth = depth + 1
+
+    try:
+        yield
+    finally:
+        _batch_state.depth = depth
+
+        if depth == 0 and _batch_state.pending:
+            _batch_state.pending = False
+            bump_questionaire_definitions_version()
+# end def questionaire_definitions_batch()
+
+def bump_questionaire_definitions_version ():
+    '''
+    Invalidates all cached questionaire definitions.
+    Called by import / delete functions, admin deletes and model save signals.
+    A new time based number rather than incr(), which is not
+    atomic on the file based cache.
+    '''
+    if getattr(_batch_state, 'depth', 0):
+        _batch_state.pending = True
+        return
+
+    version = max(_new_questionaire_definitions_version(), (cache.get(QUESTIONAIRE_DEFINITIONS_VERSION_KEY) or 0) + 1)
+    cache.set(QUESTIONAIRE_DEFINITIONS_VERSION_KEY, version, None)
+
+    questionaire_definitions_changed.send(sender=Questionaire)
+# end def bump_questionaire_definitions_version()
+
+def get_questionaire_definitions (questionaire_type):
+    '''
+    Cached get_questionaires_and_questionaire_answers().
+    Returns python list of QuestionairesAndQuestionaireAnswers objects.
+    '''
+    version = get_questionaire_definitions_version()
+    cache_key = f"questionaire_definitions:{version}:{questionaire_type}"
+
+    definitions = cache.get(cache_key)
+
+    if definitions is None:
+        definitions = get_questionaires_and_questionaire_answers(questionaire_type)
+        cache.set(cache_key, definitions, QUESTIONAIRE_DEFINITIONS_CACHE_SECONDS)
+
+    return definitions
+# end def get_questionaire_definitions()
+
+def get_all_questionaire_ids ():
+    '''
+    Cached list of (questionaire id, questionaire_type) of all questions.
+    '''
+    version = get_questionaire_definitions_version()
+    cache_key = f"questionaire_ids:{version}"
+
+    questionaire_ids = cache.get(cache_key)
+
+    if questionaire_ids is None:
+        questionaire_ids = list(
+            Questionaire.objects.values_list('id', 'questionaire_type')
+        )
+        cache.set(cache_key, questionaire_ids, QUESTIONAIRE_DEFINITIONS_CACHE_SECONDS)
+
+    return questionaire_ids
+# end def get_all_questionaire_ids()
+
+### a question's min score is never above 10 and its max score never below 0,
+### questions without answers get 10 / 0
+QUESTIONAIRE_MIN_SCORE_CAP = 10
+QUESTIONAIRE_MAX_SCORE_FLOOR = 0
+
 def update_all_questionaires_min_max_score ():
     '''
     Returns update record count.
     '''
-    count = 0
-    for questionaire_type in questionaire_types:
-        count += update_questionaires_min_max_score(questionaire_type)
-    return count
+    return _update_questionaires_min_max_score(Questionaire.objects.all())
 # end def update_all_questionaires_min_max_score()
 
 def update_questionaires_min_max_score (questionaire_type):
     '''
     Returns update record count.
     '''
-    count = 0
+    return _update_questionaires_min_max_score(
+        Questionaire.objects.filter(
+            questionaire_type = questionaire_type
+        )
+    )
+# end def get_questionaires_min_max_score()
 
-    total_min_score = 0
-    total_max_score = 0
+def _update_questionaires_min_max_score (questionaires):
+    '''
+    Stores min / max of answer_score * answer_weight on every question
+    and the sums of them per type as total min / max score.
+    One grouped query to read, one bulk_update() to write.
+    Returns update record count.
+    '''
+    answer_score = F('questionaireanswer__answer_score') * F('questionaireanswer__answer_weight')
 
-    questionaires = Questionaire.objects.filter(
-        questionaire_type = questionaire_type
+    questionaires = list(
+        questionaires.annotate(
+            answer_min_score = Min(answer_score),
+            answer_max_score = Max(answer_score),
+        ).order_by()
     )
 
-    # go through all questions in questionaire_type
+    type_totals = {}
+
     for questionaire in questionaires:
-        min_score = 10
-        max_score = 0
+        min_score = QUESTIONAIRE_MIN_SCORE_CAP
+        max_score = QUESTIONAIRE_MAX_SCORE_FLOOR
 
-        questionaire_answers = QuestionaireAnswer.objects.filter(
-            questionaire = questionaire
-        )
+        if questionaire.answer_min_score is not None:
+            min_score = min(min_score, questionaire.answer_min_score)
 
-        # got through all answers in one questionaire
-        for questionaire_answer in questionaire_answers:
-            qa_score = questionaire_answer.answer_score * questionaire_answer.answer_weight
+        if questionaire.answer_max_score is not None:
+            max_score = max(max_score, questionaire.answer_max_score)
 
-            if qa_score < min_score:
-                min_score = qa_score
-            
-            if qa_score > max_score:
-                max_score = qa_score
-        
         questionaire.min_score = min_score
         questionaire.max_score = max_score
-        questionaire.save()
-        count += 1
 
-        total_min_score += min_score
-        total_max_score += max_score
+        total_min_score, total_max_score = type_totals.get(questionaire.questionaire_type, (0, 0))
+        type_totals[questionaire.questionaire_type] = (total_min_score + min_score, total_max_score + max_score)
 
-    # also update all questionaires of the same type to store total min max score
-    count += Questionaire.objects.filter(
-        questionaire_type = questionaire_type
-    ).update(
-        total_min_score = total_min_score,
-        total_max_score = total_max_score
+    # also store total min max score on all questionaires of the same type
+    for questionaire in questionaires:
+        questionaire.total_min_score, questionaire.total_max_score = type_totals[questionaire.questionaire_type]
+
+    count = Questionaire.objects.bulk_update(
+        questionaires,
+        ['min_score', 'max_score', 'total_min_score', 'total_max_score'],
+        batch_size = 500,
     )
 
+    # bulk_update() sends no post_save signals
+    if count:
+        bump_questionaire_definitions_version()
+
     return count
-# end def get_questionaires_min_max_score()
+# end def _update_questionaires_min_max_score()
 
 def get_questionaires_total_min_max_score (questionaire_type):
     '''
@@ -116,14 +247,22 @@ def get_questionaires_total_min_max_score (questionaire_type):
 
 def get_sum_questionaires_total_min_max_score ():
     '''
+    Sum of total min / max score of all questionaire types.
+    One grouped query, every question of a type holds the same totals.
     '''
+    rows = Questionaire.objects.values(
+        'questionaire_type'
+    ).annotate(
+        type_total_min_score = Min('total_min_score'),
+        type_total_max_score = Max('total_max_score'),
+    ).order_by()
+
     total_min_score = 0
     total_max_score = 0
 
-    for questionaire_type in questionaire_types:
-        temp_total_min_score, temp_total_max_score = get_questionaires_total_min_max_score(questionaire_type)
-        total_min_score += temp_total_min_score
-        total_max_score += temp_total_max_score
+    for row in rows:
+        total_min_score += row['type_total_min_score'] or 0
+        total_max_score += row['type_total_max_score'] or 0
 
     return (total_min_score, total_max_score)
 # end def get_sum_questionaires_min_max_score()
@@ -3,11 +3,10 @@ from django.shortcuts import redirect
 
 from .choices import questionaire_types
 
-from questionaires.models import Questionaire
-from questionaire_answers.models import QuestionaireAnswer
-from user_questionaire_answers.models import UserQuestionaireAnswer
+from .utils import get_questionaire_definitions
+from .utils import get_all_questionaire_ids
 
-from .utils import get_questionaires_and_questionaire_answers
+from user_questionaire_answers.utils import save_user_questionaire_answers
 
 # Create your views here.
 
@@ -29,7 +28,8 @@ def questionaire (request, questionaire_type) :
     if not request.user.is_authenticated:
         return redirect('/')
 
-    questionaires_and_questionaire_answers = get_questionaires_and_questionaire_answers(questionaire_type)
+    # cached, only changes when admin imports questionaires
+    questionaires_and_questionaire_answers = get_questionaire_definitions(questionaire_type)
 
     context = {
         'questionaire_types'        : questionaire_types,
@@ -53,49 +53,30 @@ def save_uqa (request) :
     if request.method != 'POST':
         return redirect('/')
     
-    ## loop Questionaire for id
-    ## check each id for answer
-    ## save answer with user
+    ## collect answers of all questions posted
+    ## save them in one transaction
 
     user = request.user
 
     if DEBUG_FUNCTION:
         print(f"{user.id = }")
 
-    questionaires = Questionaire.objects.all()
+    # cached ids, no query for the questions
+    questionaire_ids = get_all_questionaire_ids()
 
-    if DEBUG_FUNCTION:
-        print('before for questionaire in questionaires:')
-
-    for questionaire in questionaires:
-        questionaire_answer_id = request.POST.get(str(questionaire.id))
-
-        if questionaire_answer_id:
-            # first delete other answers
-            UserQuestionaireAnswer.objects.filter(
-                user                = user,
-                questionaire        = questionaire
-            ).delete()
-
-            UserQuestionaireAnswer.objects.filter(
-                user                    = user,
-                questionaire__isnull    = True
-            ).delete()
-
-            # save current answer
-            questionaire_answer = QuestionaireAnswer.objects.filter(pk=questionaire_answer_id)[0]
-
-            u, c = UserQuestionaireAnswer.objects.get_or_create(
-                user                = user,
-                questionaire        = questionaire,
-                questionaire_answer = questionaire_answer
-            )
-            
-            if DEBUG_FUNCTION:
-                print(u.pk, u, c)
+    posted_answer_ids = {}
+
+    for questionaire_id, _ in questionaire_ids:
+        questionaire_answer_id = request.POST.get(str(questionaire_id))
+
+        if questionaire_answer_id and questionaire_answer_id.isdigit():
+            posted_answer_ids[questionaire_id] = int(questionaire_answer_id)
+
+    saved_count = save_user_questionaire_answers(user, posted_answer_ids)
 
     if DEBUG_FUNCTION:
-        print('after for questionaire in questionaires:')
+        print(f"{posted_answer_ids = }")
+        print(f"{saved_count = }")
 
     context = {
         'questionaire_types' : questionaire_types,
@@ -0,0 +1,289 @@
+### daily portfolio value paths from the shared price store
+###   backtest_user_investments() : replay UserInvestment rows of a user
+###   backtest_rebalancing()      : hypothetical weights rebalanced
+###                                 monthly / quarterly / on a drift threshold
+### all segments are valued at once with cumulative array operations
+
+from datetime import date
+
+import numpy as np
+
+from investment_datas.price_store import get_price_store
+from investment_datas.price_store import to_day
+
+from user_investments.utils import to_local_date
+
+REBALANCE_NONE = None
+REBALANCE_MONTHLY = 'monthly'
+REBALANCE_QUARTERLY = 'quarterly'
+REBALANCE_THRESHOLD = 'threshold'
+
+### days looked ahead at first when searching the next threshold event,
+### doubled until an event is found
+THRESHOLD_LOOKAHEAD_DAYS = 32
+
+
+class BacktestResult () :
+    '''
+    dates        : datetime64[D] array of trading days
+    values       : portfolio value per day
+    fund_names   : fund of each column of fund_values
+    fund_values  : value held in each fund per day, 2D array
+    rebalance_dates : datetime64[D] array of rebalance / holding change days
+    '''
+    def __init__ (self, dates, values, fund_names, fund_values, rebalance_dates) :
+        self.dates = dates
+        self.values = values
+        self.fund_names = fund_names
+        self.fund_values = fund_values
+        self.rebalance_dates = rebalance_dates
+
+    def as_dict (self) :
+        return {
+            'dates'             : [str(day) for day in self.dates],
+            'values'            : self.values.tolist(),
+            'fund_values'       : {
+                fund_name : self.fund_values[:, i].tolist()
+                for i, fund_name in enumerate(self.fund_names)
+            },
+            'rebalance_dates'   : [str(day) for day in self.rebalance_dates],
+        }
+# end class BacktestResult()
+
+
+def _date_range_index (price_store, start_date, end_date) :
+    '''
+    Returns (i_start, i_end) rows of the first trading day on or after
+    start_date and the last one on or before end_date, or None.
+    '''
+    i_start = price_store.resolve_date_index(start_date, side='after')
+    i_end = price_store.resolve_date_index(end_date, side='before')
+
+    if i_start is None or i_end is None or i_start > i_end:
+        return None
+
+    return i_start, i_end
+# end def _date_range_index()
+
+def backtest_user_investments (user_investments, end_date=None) :
+    '''
+    Daily value of all UserInvestment rows given, e.g. every row of a user.
+    Pass a queryset with select_related('investment_choice').
+
+    Each row buys investment_amount / begin price units of its fund
+    on the first trading day on or after begin_date and holds them
+    to end_date (inclusive), open rows to param end_date or today.
+
+    Units held per fund per day come from a difference array:
+    +units on the buy day, -units the day after the holding ends,
+    then one cumulative sum over all rows at once.
+
+    Returns BacktestResult, or None if there is nothing to value.
+    '''
+    price_store = get_price_store()
+
+    if end_date is None:
+        end_date = date.today()
+
+    end_day = to_day(end_date)
+
+    rows = []
+
+    for user_investment in user_investments:
+        if user_investment.investment_choice is None or user_investment.begin_date is None:
+            continue
+
+        fund_name = user_investment.investment_choice.investment_name
+
+        if not price_store.has_fund(fund_name):
+            continue
+
+        begin_day = to_day(to_local_date(user_investment.begin_date))
+        holding_end_day = end_day
+
+        if user_investment.end_date is not None:
+            holding_end_day = min(end_day, to_day(to_local_date(user_investment.end_date)))
+
+        rows.append((fund_name, begin_day, holding_end_day, user_investment.investment_amount or 0))
+
+    if not rows:
+        return None
+
+    fund_names = sorted({fund_name for fund_name, _, _, _ in rows})
+    fund_cols = np.array([price_store.fund_index[fund_name] for fund_name in fund_names])
+    row_funds = np.array([fund_names.index(fund_name) for fund_name, _, _, _ in rows])
+    begin_days = np.array([begin_day for _, begin_day, _, _ in rows], dtype='datetime64[D]')
+    end_days = np.array([holding_end_day for _, _, holding_end_day, _ in rows], dtype='datetime64[D]')
+    amounts = np.array([amount for _, _, _, amount in rows], dtype='float64')
+
+    date_range = _date_range_index(price_store, begin_days.min(), end_day)
+
+    if date_range is None:
+        return None
+
+    i_start, i_end = date_range
+    n_days = i_end - i_start + 1
+    prices = price_store.values[i_start:i_end + 1][:, fund_cols]
+
+    # buy on first trading day on / after begin, sell after last trading day on / before end
+    buy_rows = np.searchsorted(price_store.dates, begin_days, side='left') - i_start
+    sell_rows = np.searchsorted(price_store.dates, end_days, side='right') - i_start
+
+    active = (buy_rows < n_days) & (buy_rows < sell_rows)
+
+    buy_prices = prices[np.minimum(buy_rows, n_days - 1), row_funds]
+    units = np.where(active & (buy_prices > 0), amounts / np.where(buy_prices > 0, buy_prices, 1), 0)
+
+    # difference array of units, one extra row for holdings sold after the last day
+    unit_changes = np.zeros((n_days + 1, len(fund_names)))
+    np.add.at(unit_changes, (buy_rows[active], row_funds[active]), units[active])
+    np.add.at(unit_changes, (np.minimum(sell_rows[active], n_days), row_funds[active]), -units[active])
+
+    held_units = np.cumsum(unit_changes[:-1], axis=0)
+
+    fund_values = np.where(held_units != 0, held_units * np.nan_to_num(prices), 0)
+
+    change_rows = np.unique(np.concatenate((buy_rows[active], sell_rows[active])))
+    change_rows = change_rows[change_rows < n_days]
+
+    return BacktestResult(
+        price_store.dates[i_start:i_end + 1],
+        fund_values.sum(axis=1),
+        fund_names,
+        fund_values,
+        price_store.dates[i_start + change_rows],
+    )
+# end def backtest_user_investments()
+
+def _calendar_rebalance_rows (dates, rebalance) :
+    '''
+    Rows of the first trading day of every month / quarter after the first row.
+    '''
+    months = dates.astype('datetime64[M]').astype('int64')
+
+    if rebalance == REBALANCE_QUARTERLY:
+        periods = months // 3
+    else:
+        periods = months
+
+    return np.flatnonzero(np.diff(periods) != 0) + 1
+# end def _calendar_rebalance_rows()
+
+def _threshold_rebalance_rows (prices, weights, band) :
+    '''
+    Rows where any fund's weight drifted more than band from its target.
+    Loops over rebalance events only, each search is vectorised over
+    a lookahead window that doubles until the next event is found.
+    '''
+    n_days = len(prices)
+    rebalance_rows = []
+    s = 0
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        while s < n_days - 1:
+            # value 1 split by weights at row s
+            units = np.where(prices[s] > 0, weights / prices[s], 0)
+
+            lookahead = THRESHOLD_LOOKAHEAD_DAYS
+            found = None
+
+            while found is None:
+                window_end = min(n_days, s + 1 + lookahead)
+                holdings = prices[s + 1:window_end] * units
+                drift = np.abs(holdings / holdings.sum(axis=1, keepdims=True) - weights).max(axis=1)
+                hits = np.flatnonzero(drift > band)
+
+                if len(hits):
+                    found = s + 1 + int(hits[0])
+                elif window_end == n_days:
+                    break
+                else:
+                    lookahead *= 2
+
+            if found is None:
+                break
+
+            rebalance_rows.append(found)
+            s = found
+
+    return np.array(rebalance_rows, dtype='int64')
+# end def _threshold_rebalance_rows()
+
+def backtest_rebalancing (weights, invested_amount, start_date, end_date, rebalance=REBALANCE_MONTHLY, threshold=0.05) :
+    '''
+    Daily value of invested_amount split by weights ({fund_name : weight},
+    weights sum to 1) from start_date to end_date.
+
+    rebalance:
+        None        : buy and hold
+        'monthly'   : back to weights on the first trading day of each month
+        'quarterly' : back to weights on the first trading day of each quarter
+        'threshold' : back to weights when a fund's weight drifts more than threshold
+
+    Raises ValueError for a fund with a positive weight that is not
+    in the price store, its share would otherwise be lost silently.
+
+    Segments between rebalance days are valued all at once:
+    each segment's growth factor comes from prices gathered at the
+    segment starts, cumprod() gives the value at every segment start,
+    and every day is that value times its growth within the segment.
+
+    Returns BacktestResult, or None if there is no price data in the range.
+    '''
+    price_store = get_price_store()
+
+    fund_names = [fund_name for fund_name, weight in weights.items() if weight > 0]
+
+    missing_funds = [fund_name for fund_name in fund_names if not price_store.has_fund(fund_name)]
+
+    if missing_funds:
+        raise ValueError(f"no price data for weighted fund(s): {', '.join(missing_funds)}")
+
+    if not fund_names:
+        return None
+
+    date_range = _date_range_index(price_store, start_date, end_date)
+
+    if date_range is None:
+        return None
+
+    i_start, i_end = date_range
+    dates = price_store.dates[i_start:i_end + 1]
+    prices = price_store.values[i_start:i_end + 1][:, [price_store.fund_index[fund_name] for fund_name in fund_names]]
+    target = np.array([weights[fund_name] for fund_name in fund_names], dtype='float64')
+
+    if rebalance in (REBALANCE_MONTHLY, REBALANCE_QUARTERLY):
+        rebalance_rows = _calendar_rebalance_rows(dates, rebalance)
+    elif rebalance == REBALANCE_THRESHOLD:
+        rebalance_rows = _threshold_rebalance_rows(prices, target, threshold)
+    elif rebalance is REBALANCE_NONE:
+        rebalance_rows = np.array([], dtype='int64')
+    else:
+        raise ValueError("rebalance must be None, 'monthly', 'quarterly' or 'threshold'")
+
+    segment_starts = np.concatenate(([0], rebalance_rows)).astype('int64')
+
+    start_prices = prices[segment_starts]
+    segment_of_row = np.searchsorted(segment_starts, np.arange(len(dates)), side='right') - 1
+    row_start_prices = start_prices[segment_of_row]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # growth of each fund since its segment start, a zero start price means no growth
+        growth = np.where(row_start_prices > 0, prices / row_start_prices, 1)
+
+        # growth of each fund over segment k, from its start to the start of segment k + 1
+        segment_growth = np.where(start_prices[:-1] > 0, start_prices[1:] / start_prices[:-1], 1)
+
+    # portfolio value at every segment start
+    segment_values = invested_amount * np.concatenate(([1.0], np.cumprod(segment_growth @ target)))
+
+    fund_values = segment_values[segment_of_row, None] * target * growth
+
+    return BacktestResult(
+        dates,
+        fund_values.sum(axis=1),
+        fund_names,
+        fund_values,
+        dates[rebalance_rows],
+    )
+# end def backtest_rebalancing()
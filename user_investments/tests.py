@@ -1,3 +1,203 @@
-from django.test import TestCase
+from datetime import date
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase
+
+from investment_datas.price_store import FundPriceStore
+from user_investments import backtest
+
+
+def _price_store (seed=0, n_days=900) :
+    '''
+    FundPriceStore of random walk prices on weekdays only,
+    so some dates fall between trading days.
+    '''
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2020-01-01', periods=n_days)
+    log_returns = rng.normal(0.0003, 0.02, size=(n_days, 3))
+    log_returns[0] = 0
+    prices = 100 * np.exp(np.cumsum(log_returns, axis=0))
+    frame = pd.DataFrame(prices, index=dates, columns=['Fund_A', 'Fund_B', 'Fund_C'])
+
+    return FundPriceStore(frame, version=1, source='test')
+# end def _price_store()
+
+def _user_investment (fund_name, amount, begin_date, end_date=None) :
+    return SimpleNamespace(
+        investment_choice=SimpleNamespace(investment_name=fund_name),
+        investment_amount=amount,
+        begin_date=begin_date,
+        end_date=end_date,
+    )
+# end def _user_investment()
+
+def _loop_rebalancing (dates, prices, target, invested_amount, rebalance, threshold) :
+    '''
+    Reference: walks every day, rebalancing holdings back to target
+    on the first day of a new month / quarter or on a drift past threshold.
+    '''
+    units = invested_amount * target / prices[0]
+    values = []
+    rebalance_dates = []
+
+    for i, day in enumerate(dates):
+        holdings = units * prices[i]
+        value = holdings.sum()
+
+        if i > 0:
+            month = day.astype('datetime64[M]').astype('int64')
+            prev_month = dates[i - 1].astype('datetime64[M]').astype('int64')
+
+            if rebalance == backtest.REBALANCE_MONTHLY:
+                is_rebalance = month != prev_month
+            elif rebalance == backtest.REBALANCE_QUARTERLY:
+                is_rebalance = month // 3 != prev_month // 3
+            elif rebalance == backtest.REBALANCE_THRESHOLD:
+                is_rebalance = np.abs(holdings / value - target).max() > threshold
+            else:
+                is_rebalance = False
+
+            if is_rebalance:
+                units = value * target / prices[i]
+                rebalance_dates.append(day)
+
+        values.append(value)
+
+    return np.array(values), np.array(rebalance_dates, dtype='datetime64[D]')
+# end def _loop_rebalancing()
+
+
+class BacktestRebalancingTests (SimpleTestCase) :
+
+    def setUp (self) :
+        self.price_store = _price_store()
+        patcher = mock.patch.object(backtest, 'get_price_store', return_value=self.price_store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_matches_daily_loop (self) :
+        weights = {'Fund_A' : 0.5, 'Fund_B' : 0.3, 'Fund_C' : 0.2}
+        target = np.array(list(weights.values()))
+        start_date = date(2020, 3, 4)
+        end_date = date(2022, 11, 30)
+
+        i_start = self.price_store.resolve_date_index(start_date, side='after')
+        i_end = self.price_store.resolve_date_index(end_date, side='before')
+        dates = self.price_store.dates[i_start:i_end + 1]
+        prices = self.price_store.values[i_start:i_end + 1]
+
+        for rebalance in (None, 'monthly', 'quarterly', 'threshold'):
+            with self.subTest(rebalance=rebalance):
+                result = backtest.backtest_rebalancing(weights, 10000, start_date, end_date, rebalance=rebalance, threshold=0.05)
+                values, rebalance_dates = _loop_rebalancing(dates, prices, target, 10000, rebalance, 0.05)
+
+                np.testing.assert_array_equal(result.dates, dates)
+                np.testing.assert_allclose(result.values, values, rtol=1e-10)
+                np.testing.assert_array_equal(result.rebalance_dates, rebalance_dates)
+                np.testing.assert_allclose(result.fund_values.sum(axis=1), result.values, rtol=1e-12)
+
+    def test_threshold_rebalances_on_drift (self) :
+        result = backtest.backtest_rebalancing({'Fund_A' : 0.5, 'Fund_C' : 0.5}, 1000, date(2020, 1, 1), date(2023, 6, 30),
+                                               rebalance='threshold', threshold=0.02)
+
+        self.assertGreater(len(result.rebalance_dates), 0)
+
+    def test_unknown_rebalance_raises (self) :
+        with self.assertRaises(ValueError):
+            backtest.backtest_rebalancing({'Fund_A' : 1.0}, 1000, date(2020, 1, 1), date(2021, 1, 1), rebalance='weekly')
+
+    def test_no_prices_in_range (self) :
+        self.assertIsNone(backtest.backtest_rebalancing({'Fund_A' : 1.0}, 1000, date(2030, 1, 1), date(2031, 1, 1)))
+        self.assertIsNone(backtest.backtest_rebalancing({'Fund_A' : 0.0}, 1000, date(2020, 1, 1), date(2021, 1, 1)))
+
+    def test_weighted_fund_without_prices_raises (self) :
+        with self.assertRaisesRegex(ValueError, 'Fund_X'):
+            backtest.backtest_rebalancing({'Fund_A' : 0.6, 'Fund_X' : 0.4}, 1000, date(2020, 1, 1), date(2021, 1, 1))
+
+        # a zero weight fund is not held, prices are not needed
+        result = backtest.backtest_rebalancing({'Fund_A' : 1.0, 'Fund_X' : 0.0}, 1000, date(2020, 1, 1), date(2021, 1, 1), rebalance=None)
+
+        self.assertEqual(result.fund_names, ['Fund_A'])
+        self.assertAlmostEqual(result.values[0], 1000)
+# end class BacktestRebalancingTests()
+
+
+class BacktestUserInvestmentsTests (SimpleTestCase) :
+
+    def setUp (self) :
+        self.price_store = _price_store()
+        patcher = mock.patch.object(backtest, 'get_price_store', return_value=self.price_store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _price (self, fund_name, day) :
+        return self.price_store.get_price(fund_name, day)
+
+    def _value_on (self, result, day) :
+        i = np.flatnonzero(result.dates == np.datetime64(day, 'D'))
+        self.assertEqual(len(i), 1, f"{day} is not a trading day of the result")
+        return result.values[i[0]]
+
+    def test_buys_on_begin_date_and_holds_through_end_date (self) :
+        # 2020-02-03 and 2020-03-06 are a Monday and a Friday
+        result = backtest.backtest_user_investments(
+            [_user_investment('Fund_A', 1000, date(2020, 2, 3), date(2020, 3, 6))],
+            end_date=date(2020, 6, 30),
+        )
+        units = 1000 / self._price('Fund_A', date(2020, 2, 3))
+
+        self.assertEqual(result.dates[0], np.datetime64('2020-02-03'))
+        self.assertAlmostEqual(self._value_on(result, date(2020, 2, 3)), 1000)
+        self.assertAlmostEqual(self._value_on(result, date(2020, 3, 6)), units * self._price('Fund_A', date(2020, 3, 6)))
+        self.assertEqual(self._value_on(result, date(2020, 3, 9)), 0)
+        self.assertEqual(result.values[-1], 0)
+        np.testing.assert_array_equal(result.rebalance_dates, np.array(['2020-02-03', '2020-03-09'], dtype='datetime64[D]'))
+
+    def test_begin_on_weekend_buys_next_trading_day (self) :
+        # 2020-02-01 is a Saturday
+        result = backtest.backtest_user_investments(
+            [_user_investment('Fund_B', 500, date(2020, 2, 1), date(2020, 2, 29))],
+            end_date=date(2020, 3, 31),
+        )
+
+        self.assertEqual(result.dates[0], np.datetime64('2020-02-03'))
+        self.assertAlmostEqual(result.values[0], 500)
+        # held through the last trading day before the Saturday end date, sold the Monday after
+        self.assertGreater(self._value_on(result, date(2020, 2, 28)), 0)
+        self.assertEqual(self._value_on(result, date(2020, 3, 2)), 0)
+
+    def test_open_rows_are_held_to_end_date (self) :
+        result = backtest.backtest_user_investments(
+            [
+                _user_investment('Fund_A', 1000, date(2020, 1, 6)),
+                _user_investment('Fund_C', 2000, date(2020, 4, 1), date(2020, 9, 30)),
+                _user_investment('Fund_A', 300, date(2020, 7, 1)),
+            ],
+            end_date=date(2021, 1, 29),
+        )
+
+        self.assertEqual(result.fund_names, ['Fund_A', 'Fund_C'])
+        self.assertEqual(result.dates[-1], np.datetime64('2021-01-29'))
+
+        # reference: per day sum of units of every row held that day
+        rows = [('Fund_A', 1000, '2020-01-06', '2021-01-29'),
+                ('Fund_C', 2000, '2020-04-01', '2020-09-30'),
+                ('Fund_A', 300, '2020-07-01', '2021-01-29')]
+        expected = np.zeros(len(result.dates))
+
+        for fund_name, amount, begin, end in rows:
+            units = amount / self._price(fund_name, begin)
+            held = (result.dates >= np.datetime64(begin)) & (result.dates <= np.datetime64(end))
+            col = self.price_store.fund_index[fund_name]
+            i_start = self.price_store.resolve_date_index(result.dates[0], side='after')
+            expected += np.where(held, units * self.price_store.values[i_start:i_start + len(result.dates), col], 0)
+
+        np.testing.assert_allclose(result.values, expected, rtol=1e-10)
+
+    def test_skips_rows_without_prices (self) :
+        self.assertIsNone(backtest.backtest_user_investments([_user_investment('Fund_X', 1000, date(2020, 1, 6))]))
+        self.assertIsNone(backtest.backtest_user_investments([_user_investment('Fund_A', 1000, None)]))
+# end class BacktestUserInvestmentsTests()
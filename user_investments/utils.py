@@ -4,7 +4,7 @@ from datetime import date
 from datetime import timedelta
 from config.settings import DATE_STRING_FORMAT
 
-from investment_datas.models import InvestmentData
+from investment_datas.price_store import get_price_store
 
 
 def make_aware_datetime (date_string) :
@@ -58,45 +58,93 @@ def make_aware_the_next_day (date_string) :
     return the_next_day
 # end def make_aware_tomorrow()
 
-def calc_end_inv_amount (user_investment, end_date=None):
+def to_local_date (value) :
     '''
-    Returns amount at user_investment.end_date
+    Returns a date for a date / datetime value.
+    Aware datetimes are converted to local time first,
+    database values come back in UTC.
+    '''
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        return value.date()
+
+    return value
+# end def to_local_date()
+
+def calc_end_inv_amounts (user_investments, end_date=None):
+    '''
+    Batched valuation of many UserInvestment rows.
+    Pass a queryset with select_related('investment_choice')
+    so the holdings are one query, begin / end prices come
+    from the shared price store without any query.
+
+    End date of each holding is user_investment.end_date
     or param end_date
     or system current date
+
+    Begin price is the first price on or after the begin date,
+    end price the last price on or before the end date.
+
+    Returns dictionary of user_investment.id : (end_inv_amount, inv_return_percent)
+    End amount is 0 when there is no such begin or end price.
     '''
+    price_store = get_price_store()
+
+    default_end_date = end_date
 
-    begin_date = user_investment.begin_date
+    if not default_end_date:
+        default_end_date = date.today()
 
-    begin_investment_data = InvestmentData.objects.filter(
-        investment_choice   = user_investment.investment_choice,
-        investment_date     = begin_date
-    )[0]
+    default_end_date = to_local_date(default_end_date)
 
-    begin_inv_price = begin_investment_data.investment_price
+    end_inv_amounts = {}
 
-    inv_end_date = user_investment.end_date
+    for user_investment in user_investments:
+        investment_name = user_investment.investment_choice.investment_name
 
-    if not inv_end_date:
-        inv_end_date = end_date
+        # bought at the first price on or after begin date
+        begin_price_found = price_store.price_on_or_after(
+            investment_name,
+            to_local_date(user_investment.begin_date)
+        )
 
-    if not inv_end_date:
-        inv_end_date = date.today()
+        if user_investment.end_date:
+            inv_end_date = to_local_date(user_investment.end_date)
+        else:
+            inv_end_date = default_end_date
 
-    end_investment_datas = InvestmentData.objects.filter(
-        investment_choice   = user_investment.investment_choice,
-        investment_date     = inv_end_date
-    )
+        # valued at the last price on or before end date (weekends / holidays)
+        end_price_found = price_store.price_on_or_before(investment_name, inv_end_date)
 
-    if end_investment_datas.count():
-        end_investment_data = end_investment_datas[0]
+        begin_inv_amount = user_investment.investment_amount or 0
 
-        end_inv_price = end_investment_data.investment_price
+        if begin_price_found and end_price_found and begin_price_found[1]:
+            _, begin_inv_price = begin_price_found
+            _, end_inv_price = end_price_found
 
-        begin_inv_amount = user_investment.investment_amount
+            # amount grows with the price
+            end_inv_amount = begin_inv_amount * end_inv_price / begin_inv_price
+        else:
+            end_inv_amount = 0
 
-        end_inv_amount = begin_inv_amount * begin_inv_price / end_inv_price
-    else:
-        end_inv_amount = 0
+        if begin_inv_amount == 0:
+            inv_return_percent = 0
+        else:
+            inv_return_percent = 100 * (end_inv_amount - begin_inv_amount) / begin_inv_amount
+
+        end_inv_amounts[user_investment.id] = (end_inv_amount, inv_return_percent)
+
+    return end_inv_amounts
+# end def calc_end_inv_amounts()
+
+def calc_end_inv_amount (user_investment, end_date=None):
+    '''
+    Returns amount at user_investment.end_date
+    or param end_date
+    or system current date
+    '''
+    end_inv_amount, _ = calc_end_inv_amounts([user_investment], end_date)[user_investment.id]
 
     return end_inv_amount
 # end def calc_end_amount()
@@ -1,7 +1,6 @@
 from django.shortcuts import render
 from django.shortcuts import redirect
 
-from investment_types.models import InvestmentType
 from investment_choices.models import InvestmentChoice
 
 from user_investments.models import UserInvestment
@@ -10,7 +9,9 @@ from user_investments.utils import make_aware_datetime
 from user_investments.utils import make_aware_the_next_day
 from user_investments.utils import make_aware_today
 from user_investments.utils import make_aware_tomorrow
-from user_investments.utils import calc_end_inv_amount
+from user_investments.utils import calc_end_inv_amounts
+
+from user_investments.backtest import backtest_user_investments
 
 ### import to use django messages framework
 from django.contrib import messages
@@ -20,11 +21,9 @@ from config.settings import DATE_STRING_FORMAT
 
 from user_questionaire_answers.utils import is_user_finished_all_questionaires
 
-from user_questionaire_answers.utils import user_questionaire_score
-
-from questionaires.utils import get_sum_questionaires_total_min_max_score
+from user_questionaire_answers.utils import get_user_risk_profile
 
-from math import floor as math_floor
+from investment_types.utils import get_investment_allocation
 
 # Create your views here.
 
@@ -68,8 +67,13 @@ def show (request) :
     user_investments = UserInvestment.objects.filter(
         user = request.user,
         user_investment_name = user_investment_name
+    ).select_related(
+        'investment_choice'
     )
 
+    # all holdings valued at once
+    end_inv_amounts = calc_end_inv_amounts(user_investments)
+
     total_begin_inv_amount = 0
     total_end_inv_amount = 0
     end_inv_amount_dict = {}
@@ -78,18 +82,13 @@ def show (request) :
 
     for user_investment in user_investments:
         begin_inv_amount = user_investment.investment_amount
-        end_inv_amount = calc_end_inv_amount(user_investment)
+        end_inv_amount, inv_return = end_inv_amounts[user_investment.id]
 
         total_begin_inv_amount += begin_inv_amount
         total_end_inv_amount += end_inv_amount
 
         end_inv_amount_dict[user_investment.id] = f"{end_inv_amount:.2f}"
 
-        if begin_inv_amount == 0:
-            inv_return = 0
-        else:
-            inv_return = 100 * (end_inv_amount - begin_inv_amount) / begin_inv_amount
-
         inv_return_percent_dict[user_investment.id] = f"{inv_return:.1f}"
 
         if DEBUG_FUNCTION:
@@ -105,11 +104,15 @@ def show (request) :
     if DEBUG_FUNCTION:
         print(f"{end_inv_amount_dict = }")
 
+    # daily value of all the holdings, for the value history chart
+    backtest_result = backtest_user_investments(user_investments)
+
     context = {
         'user_investments'          : user_investments,
         'end_inv_amount_dict'       : end_inv_amount_dict,
         'inv_return_percent_dict'   : inv_return_percent_dict,
         'total_inv_return_percent'  : f"{total_inv_return_percent:.1f}",
+        'value_history'             : backtest_result.as_dict() if backtest_result is not None else None,
     }
 
     return render(request, 'user_investments/show.html', context)
@@ -264,66 +267,22 @@ def ai_investment_choices (request) :
 
     # ai limit investment choices
 
-    user_questionaires_score = user_questionaire_score(request.user)
-
-    ## need to normalize to total min/max score
+    ## stored profile, updated when the user saved the questionaires
 
-    total_min_score, total_max_score = get_sum_questionaires_total_min_max_score()
+    risk_profile = get_user_risk_profile(request.user)
 
-    def normalize_score (user_score, min_score, max_score, map_min_score, map_max_score):
-        n = (user_score - min_score) / (max_score - min_score)
-        n_map = n * (map_max_score - map_min_score) + map_min_score
-        return n_map
+    ## types, choices and percentages from the in memory index
 
-    normalized_user_questionaires_score = normalize_score(
-        user_questionaires_score, 
-        total_min_score,
-        total_max_score,
-        0,
-        10,
-    )
-
-    investment_types = InvestmentType.objects.filter(
-        investment_score_range_start__lte = normalized_user_questionaires_score,
-        investment_score_range_end__gte = normalized_user_questionaires_score
-    )
+    allocation = get_investment_allocation(risk_profile.normalized_score)
 
-    investment_choices = InvestmentChoice.objects.filter(
-        investment_type__in = investment_types
-    )
+    investment_choices = allocation['investment_choices']
+    inv_name_val_dict = allocation['inv_name_val_dict']
 
     if DEBUG_FUNCTION:
-        print(f"{user_questionaires_score = }")
-        print(f"{total_max_score = }")
-        print(f"{total_max_score = }")
-        print(f"{normalized_user_questionaires_score = }")
-        print(f"{investment_types.count() = }")
-        print(f"{investment_choices.count() = }")
-
-    def floor_to_tens (n):
-        return int(math_floor(n / 10) * 10)
-
-    # inv_names = []
-    # inv_values = []
-    inv_name_val_dict = {}
-
-    # set to same inv_value
-    # use average
-    if investment_choices.count() != 0:
-        inv_value = floor_to_tens(100 / investment_choices.count())
-    else:
-        inv_value = 0
-
-    ### need to store string value into dictioinary for template html to use
-    inv_value = str(inv_value)
-
-    for investment_choice in investment_choices:
-        inv_name = investment_choice.investment_name
-
-        # store values for context
-        # inv_names.append(inv_name)
-        # inv_values.append(inv_value)
-        inv_name_val_dict[inv_name] = inv_value
+        print(f"{risk_profile.raw_score = }")
+        print(f"{risk_profile.normalized_score = }")
+        print(f"{allocation['investment_types'] = }")
+        print(f"{len(investment_choices) = }")
 
     if DEBUG_FUNCTION:
         print (f"user_investments.views.ai_investment_choices() {inv_name_val_dict = }")
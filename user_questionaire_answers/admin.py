@@ -3,6 +3,7 @@ from django.contrib import admin
 # Register your models here.
 
 from .models import UserQuestionaireAnswer
+from .models import UserRiskProfile
 
 class UserQuestionaireAnswerAdmin (admin.ModelAdmin) :
     # list_display = ('user_id', 'user', 'questionaire_answer')
@@ -20,3 +21,13 @@ class UserQuestionaireAnswerAdmin (admin.ModelAdmin) :
 
 admin.site.register (UserQuestionaireAnswer, UserQuestionaireAnswerAdmin)
 
+
+class UserRiskProfileAdmin (admin.ModelAdmin) :
+    list_display = ('user', 'raw_score', 'normalized_score', 'investment_type', 'is_stale', 'updated_at')
+    list_display_links = ('user', )
+    list_editable = ( )
+    search_fields = ('user__username', )
+    list_per_page = 25
+
+
+admin.site.register (UserRiskProfile, UserRiskProfileAdmin)
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class UserQuestionaireAnswersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'user_questionaire_answers'
+
+    def ready(self):
+        import user_questionaire_answers.signals
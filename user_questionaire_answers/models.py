@@ -6,6 +6,8 @@ from questionaires.models import Questionaire
 
 from questionaire_answers.models import QuestionaireAnswer
 
+from investment_types.models import InvestmentType
+
 # Create your models here.
 
 class UserQuestionaireAnswer (models.Model) :
@@ -16,3 +18,23 @@ class UserQuestionaireAnswer (models.Model) :
     def __str__ (self) :
         return str(self.user.id) + ' ' + str(self.questionaire.id) + ' ' + str(self.questionaire_answer.id)
 
+
+
+class UserRiskProfile (models.Model) :
+    '''
+    Materialised result of a user's questionaires,
+    updated when the user saves answers.
+    completion is {questionaire_type : {'answered', 'total', 'score'}}.
+    is_stale is set when questionaires or investment types change,
+    the profile is then recomputed on next read.
+    '''
+    user = models.OneToOneField (User, on_delete=models.CASCADE, related_name='risk_profile')
+    raw_score = models.FloatField (default=0)
+    normalized_score = models.FloatField (blank=True, null=True)
+    completion = models.JSONField (default=dict, blank=True)
+    investment_type = models.ForeignKey (InvestmentType, on_delete=models.SET_NULL, blank=True, null=True)
+    is_stale = models.BooleanField (default=False)
+    updated_at = models.DateTimeField (auto_now=True)
+
+    def __str__ (self) :
+        return str(self.user.id) + ' ' + str(self.normalized_score)
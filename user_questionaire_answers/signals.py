@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from investment_types.models import InvestmentType
+from questionaires.utils import questionaire_definitions_changed
+from .utils import mark_user_risk_profiles_stale
+
+# Stored risk profiles depend on questionaire scores and investment type ranges
+@receiver(questionaire_definitions_changed)
+@receiver(post_save, sender=InvestmentType)
+@receiver(post_delete, sender=InvestmentType)
+def risk_profile_inputs_changed(sender, **kwargs):
+    mark_user_risk_profiles_stale()
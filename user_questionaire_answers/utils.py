@@ -1,7 +1,72 @@
+from django.db import transaction
+from django.db.models import Q
+from django.db.models import F
+from django.db.models import Sum
+from django.db.models import Count
+from django.core.cache import cache
+
 from questionaires.models import Questionaire
+from questionaire_answers.models import QuestionaireAnswer
 from user_questionaire_answers.models import UserQuestionaireAnswer
+from user_questionaire_answers.models import UserRiskProfile
+
+from investment_types.utils import get_investment_type_index
 
 from questionaires.choices import questionaire_types
+from questionaires.utils import get_questionaire_definitions_version
+from questionaires.utils import get_sum_questionaires_total_min_max_score
+
+def get_user_questionaire_completion (user) :
+    '''
+    Returns dictionary of questionaire_type : (answered count, total count)
+    for all questionaire types, from one grouped query.
+    '''
+    completion = {questionaire_type : (0, 0) for questionaire_type in questionaire_types}
+
+    rows = Questionaire.objects.values(
+        'questionaire_type'
+    ).annotate(
+        total_count = Count('id', distinct=True),
+        answered_count = Count(
+            'id',
+            filter = Q(userquestionaireanswer__user = user),
+            distinct = True
+        ),
+    ).order_by()
+
+    for row in rows:
+        completion[row['questionaire_type']] = (row['answered_count'], row['total_count'])
+
+    return completion
+# end def get_user_questionaire_completion()
+
+### the snapshot is in the shared cache (settings.CACHES) and cleared on save,
+### it also expires in case answers change another way
+USER_QUESTIONAIRE_COMPLETION_CACHE_SECONDS = 300
+
+def _user_questionaire_completion_cache_key (user) :
+    # definitions version in the key, so new / deleted questions also invalidate
+    return f"user_questionaire_completion:{get_questionaire_definitions_version()}:{user.id}"
+
+def get_cached_user_questionaire_completion (user) :
+    '''
+    Cached per user snapshot of get_user_questionaire_completion().
+    Cleared by clear_user_questionaire_completion() when answers are saved.
+    '''
+    cache_key = _user_questionaire_completion_cache_key(user)
+
+    completion = cache.get(cache_key)
+
+    if completion is None:
+        completion = get_user_questionaire_completion(user)
+        cache.set(cache_key, completion, USER_QUESTIONAIRE_COMPLETION_CACHE_SECONDS)
+
+    return completion
+# end def get_cached_user_questionaire_completion()
+
+def clear_user_questionaire_completion (user) :
+    cache.delete(_user_questionaire_completion_cache_key(user))
+# end def clear_user_questionaire_completion()
 
 def is_user_finished_questionaire (user, questionaire_type) :
     '''
@@ -10,37 +75,24 @@ def is_user_finished_questionaire (user, questionaire_type) :
     '''
     DEBUG_FUNCTION = False
 
-    if DEBUG_FUNCTION:
-        print(f"is_user_finished_questionaire (user, questionaire_type) : {questionaire_type = }")
+    answered_count, total_count = get_cached_user_questionaire_completion(user).get(
+        questionaire_type, (0, 0)
+    )
 
-    questionaire_count = Questionaire.objects.filter(
-        questionaire_type = questionaire_type
-    ).count()
+    if DEBUG_FUNCTION:
+        print(f"is_user_finished_questionaire (user, questionaire_type) : {questionaire_type = } {answered_count = } {total_count = }")
 
-    if questionaire_count == 0:
+    if total_count == 0:
         # no questions set
         return False
 
-    if DEBUG_FUNCTION:
-        print(f"is_user_finished_questionaire (user, questionaire_type) : {questionaire_count = }")
-
-    user_questionaire_count = UserQuestionaireAnswer.objects.filter(
-        user = user,
-        questionaire__questionaire_type = questionaire_type
-    ).count()
-
-    if DEBUG_FUNCTION:
-        print(f"is_user_finished_questionaire (user, questionaire_type) : {user_questionaire_count = }")
-
-    if questionaire_count == user_questionaire_count :
-        return True
-    else:
-        return False
+    return answered_count == total_count
 # end def is_user_finished_questionaire ()
 
 def is_user_finished_all_questionaires (user) :
     '''
     Returns True if user has finished all questionaires.
+    Uses the cached completion snapshot, no query when cached.
     '''
     DEBUG_FUNCTION = False
 
@@ -55,18 +107,241 @@ def is_user_finished_all_questionaires (user) :
     return user_finished_questionaire_count == len(questionaire_types)
 # end def is_user_finished_questionaires ()
 
-def user_questionaire_score (user):
+def weighted_answer_score_sum ():
     '''
+    Sum of answer_score * answer_weight, computed in the database.
     '''
-    total_score = 0
+    return Sum(
+        F('questionaire_answer__answer_score') * F('questionaire_answer__answer_weight')
+    )
+# end def weighted_answer_score_sum()
 
+def user_questionaire_score (user, questionaire_type=None):
+    '''
+    Returns weighted score of all answers of user,
+    or only answers of questionaire_type if given.
+    One aggregate query.
+    '''
     user_questionaire_answers = UserQuestionaireAnswer.objects.filter(
         user = user
     )
 
-    for user_questionaire_answer in user_questionaire_answers:
-        total_score += user_questionaire_answer.questionaire_answer.answer_score * \
-            user_questionaire_answer.questionaire_answer.answer_weight
+    if questionaire_type:
+        user_questionaire_answers = user_questionaire_answers.filter(
+            questionaire__questionaire_type = questionaire_type
+        )
+
+    total_score = user_questionaire_answers.aggregate(
+        total_score = weighted_answer_score_sum()
+    )['total_score']
     
-    return total_score
+    return total_score or 0
 # end def user_questionaire_score()
+
+def save_user_questionaire_answers (user, posted_answer_ids) :
+    '''
+    Bulk save of one questionaire form.
+    posted_answer_ids is dictionary of questionaire id : questionaire_answer id.
+    Answer ids are checked with one query, answers not belonging
+    to their question are ignored.
+    Replaces the user's answers of the answered questions with
+    one delete and one bulk_create() inside a transaction.
+    Returns saved record count.
+    '''
+    # one query to validate all posted answers
+    valid_answer_ids = dict(
+        QuestionaireAnswer.objects.filter(
+            pk__in = posted_answer_ids.values()
+        ).values_list(
+            'id',
+            'questionaire_id',
+        )
+    )
+
+    answers = {
+        questionaire_id : questionaire_answer_id
+        for questionaire_id, questionaire_answer_id in posted_answer_ids.items()
+        if valid_answer_ids.get(questionaire_answer_id) == questionaire_id
+    }
+
+    if not answers:
+        return 0
+
+    with transaction.atomic():
+        # old answers of the same questions, and answers without a question
+        UserQuestionaireAnswer.objects.filter(
+            user = user
+        ).filter(
+            Q(questionaire_id__in = answers.keys()) | Q(questionaire__isnull = True)
+        ).delete()
+
+        UserQuestionaireAnswer.objects.bulk_create([
+            UserQuestionaireAnswer(
+                user                    = user,
+                questionaire_id         = questionaire_id,
+                questionaire_answer_id  = questionaire_answer_id,
+            )
+            for questionaire_id, questionaire_answer_id in answers.items()
+        ])
+
+    clear_user_questionaire_completion(user)
+
+    update_user_risk_profile(user)
+
+    return len(answers)
+# end def save_user_questionaire_answers()
+
+def user_questionaire_scores_by_type (user):
+    '''
+    Returns dictionary of questionaire_type : weighted score of user.
+    One grouped query.
+    '''
+    scores = {questionaire_type : 0 for questionaire_type in questionaire_types}
+
+    rows = UserQuestionaireAnswer.objects.filter(
+        user = user,
+        questionaire__isnull = False,
+    ).values(
+        'questionaire__questionaire_type'
+    ).annotate(
+        score = weighted_answer_score_sum()
+    ).order_by()
+
+    for row in rows:
+        scores[row['questionaire__questionaire_type']] = row['score'] or 0
+
+    return scores
+# end def user_questionaire_scores_by_type()
+
+def users_questionaire_scores (users=None, by_type=False):
+    '''
+    Scores many users in one query, for reports and batch recommendation.
+    users is a User queryset / list of users, None for all users.
+    Returns dictionary of user id : weighted score
+    or, with by_type, user id : {questionaire_type : weighted score}.
+    Users without answers are not included.
+    '''
+    user_questionaire_answers = UserQuestionaireAnswer.objects.filter(
+        user__isnull = False
+    )
+
+    if users is not None:
+        user_questionaire_answers = user_questionaire_answers.filter(
+            user__in = users
+        )
+
+    if by_type:
+        rows = user_questionaire_answers.filter(
+            questionaire__isnull = False
+        ).values(
+            'user_id',
+            'questionaire__questionaire_type',
+        ).annotate(
+            score = weighted_answer_score_sum()
+        ).order_by()
+
+        scores = {}
+
+        for row in rows:
+            user_scores = scores.setdefault(
+                row['user_id'],
+                {questionaire_type : 0 for questionaire_type in questionaire_types}
+            )
+            user_scores[row['questionaire__questionaire_type']] = row['score'] or 0
+
+        return scores
+
+    rows = user_questionaire_answers.values(
+        'user_id'
+    ).annotate(
+        score = weighted_answer_score_sum()
+    ).order_by()
+
+    return {row['user_id'] : row['score'] or 0 for row in rows}
+# end def users_questionaire_scores()
+
+def normalize_score (user_score, min_score, max_score, map_min_score, map_max_score):
+    '''
+    Maps user_score from min_score .. max_score to map_min_score .. map_max_score.
+    Returns None if the score range is empty.
+    '''
+    if min_score is None or max_score is None or max_score == min_score:
+        return None
+
+    n = (user_score - min_score) / (max_score - min_score)
+    n_map = n * (map_max_score - map_min_score) + map_min_score
+    return n_map
+# end def normalize_score()
+
+def update_user_risk_profile (user) :
+    '''
+    Recomputes and saves the UserRiskProfile of user.
+    Called after answers are saved, so reading the
+    recommendation is a single row read.
+    Returns the profile.
+    '''
+    type_scores = user_questionaire_scores_by_type(user)
+
+    completion = {
+        questionaire_type : {
+            'answered'  : answered_count,
+            'total'     : total_count,
+            'score'     : type_scores.get(questionaire_type, 0),
+        }
+        for questionaire_type, (answered_count, total_count)
+        in get_user_questionaire_completion(user).items()
+    }
+
+    raw_score = sum(type_scores.values())
+
+    total_min_score, total_max_score = get_sum_questionaires_total_min_max_score()
+
+    normalized_score = normalize_score(
+        raw_score,
+        total_min_score,
+        total_max_score,
+        0,
+        10,
+    )
+
+    investment_types = get_investment_type_index().lookup(normalized_score)
+
+    investment_type = investment_types[0] if investment_types else None
+
+    profile, _ = UserRiskProfile.objects.update_or_create(
+        user = user,
+        defaults = {
+            'raw_score'         : raw_score,
+            'normalized_score'  : normalized_score,
+            'completion'        : completion,
+            'investment_type'   : investment_type,
+            'is_stale'          : False,
+        }
+    )
+
+    return profile
+# end def update_user_risk_profile()
+
+def get_user_risk_profile (user) :
+    '''
+    Returns the stored UserRiskProfile of user,
+    recomputed first if missing or stale.
+    '''
+    profile = UserRiskProfile.objects.filter(
+        user = user
+    ).select_related(
+        'investment_type'
+    ).first()
+
+    if profile is None or profile.is_stale:
+        profile = update_user_risk_profile(user)
+
+    return profile
+# end def get_user_risk_profile()
+
+def mark_user_risk_profiles_stale () :
+    '''
+    One update, profiles are recomputed lazily by get_user_risk_profile().
+    '''
+    UserRiskProfile.objects.filter(is_stale = False).update(is_stale = True)
+# end def mark_user_risk_profiles_stale()